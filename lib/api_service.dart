@@ -1,3 +1,5 @@
+import 'dart:convert';
+
 import 'package:dio_cookie_manager/dio_cookie_manager.dart';
 import 'package:flutter/material.dart';
 import 'package:mini_rpg_flutter/constant.dart';
@@ -23,9 +25,55 @@ void gotoPage(BuildContext context, Widget target, int ms) {
 
 void setupDio() {
   dio.interceptors.add(CookieManager(cookieJar));
+  dio.interceptors.add(EtagInterceptor());
   dio.options.baseUrl = 'http://127.0.0.1:5000';
 }
 
+// Keeps the body of GET responses that have an ETag and sends the tag back,
+// a 304 from the server is answered with the kept body.
+class EtagInterceptor extends Interceptor {
+  final Map<String, String> _etags = {};
+  final Map<String, String> _bodies = {};
+
+  @override
+  void onRequest(RequestOptions options, RequestInterceptorHandler handler) {
+    final etag = _etags[options.uri.toString()];
+    if (options.method == 'GET' && etag != null) {
+      options.headers['If-None-Match'] = etag;
+    }
+    handler.next(options);
+  }
+
+  @override
+  void onResponse(Response response, ResponseInterceptorHandler handler) {
+    final etag = response.headers.value('etag');
+    if (response.requestOptions.method == 'GET' && etag != null) {
+      final key = response.requestOptions.uri.toString();
+      _etags[key] = etag;
+      // kept as text, callers change the decoded data
+      _bodies[key] = jsonEncode(response.data);
+    }
+    handler.next(response);
+  }
+
+  @override
+  void onError(DioException err, ErrorInterceptorHandler handler) {
+    final body = _bodies[err.requestOptions.uri.toString()];
+    if (err.response?.statusCode == 304 && body != null) {
+      handler.resolve(
+        Response(
+          requestOptions: err.requestOptions,
+          data: jsonDecode(body),
+          statusCode: 200,
+          headers: err.response!.headers,
+        ),
+      );
+      return;
+    }
+    handler.next(err);
+  }
+}
+
 void showToast(BuildContext context, String message) {
   ScaffoldMessenger.of(context).showSnackBar(
     SnackBar(
@@ -211,6 +259,25 @@ Future<Map<int, int>> getMaxExpData(
   return result;
 }
 
+// character, class with skills, merged max exp, world, inventory and
+// accepted quests of a character in one request
+Future<Map<String, dynamic>> getBootstrapData(
+  BuildContext context,
+  int id,
+) async {
+  final response = await sendRequest(context, () => dio.get('/bootstrap/$id'));
+  Map<String, dynamic> data = response?.data["data"];
+  for (Map<String, dynamic> skill in data["class"]["skills"]) {
+    skill.removeWhere((key, value) => value == 0);
+  }
+  Map<int, int> maxExp = {};
+  for (var exp in data["maxExp"]) {
+    maxExp[exp["level"]] = exp["exp"];
+  }
+  data["maxExp"] = maxExp;
+  return data;
+}
+
 Future<Map<String, dynamic>> getWorldData(BuildContext context, int id) async {
   final response = await sendRequest(context, () => dio.get('/world/all/$id'));
   return response?.data;
@@ -237,29 +304,36 @@ Future<void> saveUserData(
   BuildContext context,
   Map<String, dynamic> data,
 ) async {
-  // save position data
+  // character and position in one request, unchanged data is not written
+  final character = data["character"];
   var parameter = {
-    "id": data["character"]["char_id"],
+    "char_id": character["char_id"],
+    "version": character["version"],
+    "level": character["level"],
+    "coin": character["coin"],
+    "exp": character["exp"],
+    "hp": character["hp"],
     "x": data["world"]["player"]["x_pos"],
     "y": data["world"]["player"]["y_pos"],
   };
-  var response = await sendRequest(
-    context,
-    () => dio.patch(
-      '/world/update',
+  try {
+    final response = await dio.post(
+      '/character/save',
       data: parameter,
       options: Options(contentType: Headers.jsonContentType),
-    ),
-  );
-  // save character data
-  response = await sendRequest(
-    context,
-    () => dio.patch(
-      '/character/update',
-      data: data["character"],
-      options: Options(contentType: Headers.jsonContentType),
-    ),
-  );
+    );
+    character["version"] = response.data["version"];
+  } on DioException catch (e) {
+    if (e.response?.statusCode == 409) {
+      // saved from newer data somewhere else, continue from that
+      character.addAll(e.response?.data["data"]);
+      return;
+    }
+    showToast(
+      context,
+      "/character/save ${e.response?.statusCode} | ${e.response?.data ?? e.message}",
+    );
+  }
 }
 
 Future<List<dynamic>> getShopData(BuildContext context) async {
@@ -275,7 +349,8 @@ Future<List<dynamic>> getInventoryData(BuildContext context, int charId) async {
   return response?.data;
 }
 
-Future<bool> buyItem(
+// returns the new version of the character, null on failure
+Future<int?> buyItem(
   BuildContext context,
   int charId,
   int itemId,
@@ -296,15 +371,23 @@ Future<bool> buyItem(
   );
   if (response != null && response.statusCode.toString().startsWith("2")) {
     showToast(context, "Success to buy Item!");
-    return true;
+    return response.data["version"];
   } else {
-    return false;
+    return null;
   }
 }
 
-Future<Map<String, dynamic>> getQuest(BuildContext context, int id) async {
-  final response = await sendRequest(context, () => dio.get('/quest/$id'));
-  return response?.data;
+Future<Map<String, dynamic>> getQuest(
+  BuildContext context,
+  int id,
+  int charId,
+) async {
+  final response = await sendRequest(
+    context,
+    () => dio.get('/quest/$id', queryParameters: {"char_id": charId}),
+  );
+  // no quest left to give for this character
+  return response?.data ?? {};
 }
 
 Future<List<dynamic>> getAcceptQuests(BuildContext context, int charId) async {
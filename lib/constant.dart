@@ -9,6 +9,14 @@ Color CLICK_COLOR = Color(0xff377535);
 double MAP_WIDTH = 3000;
 double MAP_HEIGHT = 3000;
 
+// A skill can be used once the character is at most SKILL_LEVEL_MARGIN levels
+// below it. The server counts buff skills by the same rule
+// (SKILL_LEVEL_MARGIN in mySQL/effective_stats.py).
+const int SKILL_LEVEL_MARGIN = 10;
+
+bool isSkillActive(int characterLevel, int skillLevel) =>
+    characterLevel + SKILL_LEVEL_MARGIN >= skillLevel;
+
 extension ColorExtension on String {
   toColor() {
     var hexString = "ff$this";
@@ -207,14 +207,17 @@ class _InventoryState extends State<Inventory> {
                         onTap:
                             canBuy
                                 ? () async {
-                                  if (await buyItem(
+                                  final version = await buyItem(
                                     context,
                                     widget.data["character"]["char_id"],
                                     data["item_id"],
                                     1,
-                                  )) {
+                                  );
+                                  if (version != null) {
                                     widget.data["character"]["coin"] -=
                                         data["price"];
+                                    widget.data["character"]["version"] =
+                                        version;
                                     loadData();
                                   }
                                 }
@@ -34,15 +34,7 @@ class _WorldPageState extends State<WorldPage> {
   final Set<LogicalKeyboardKey> _keysPressed = {};
 
   void loadData() async {
-    data["character"] = await getCharacterInfo(context, widget.charId);
-    data["class"] = await getClassData(context, data["character"]["class_id"]);
-    data["maxExp"] = await getMaxExpData(
-      context,
-      data["class"]["class_id"],
-      data["class"]["include_class"],
-    );
-    data["world"] = await getWorldData(context, data["character"]["char_id"]);
-    data["acceptQuest"] = await getAcceptQuests(context, widget.charId);
+    data.addAll(await getBootstrapData(context, widget.charId));
     setState(() {
       scrollStep = data["character"]["speed"].toDouble() / 3.5;
       loading = false;
@@ -202,7 +194,11 @@ class _WorldPageState extends State<WorldPage> {
               .distance;
       final bool collided = distance <= playerSize * 2;
       if (data["focusNpc"] == null && collided) {
-        Map<String, dynamic> quest = await getQuest(context, npc["npc_id"]);
+        Map<String, dynamic> quest = await getQuest(
+          context,
+          npc["npc_id"],
+          widget.charId,
+        );
         setState(() {
           data["focusNpc"] = {...npc, ...quest};
         });
@@ -229,8 +225,8 @@ class _WorldPageState extends State<WorldPage> {
   }
 
   void _activeSkill(int index) async {
-    if (data["character"]["level"] + 10 <
-        data["class"]["skills"][index]["level"]) {
+    if (!isSkillActive(
+        data["character"]["level"], data["class"]["skills"][index]["level"])) {
       return;
     }
     setState(() {
@@ -459,7 +455,7 @@ class _WorldPageState extends State<WorldPage> {
                                 ),
                               ),
                               Text(
-                                data["focusNpc"]["npc_talk"],
+                                data["focusNpc"]["npc_talk"] ?? "...",
                                 style: TextStyle(
                                   fontSize: 30,
                                   fontFamily: "pixel",
@@ -469,26 +465,27 @@ class _WorldPageState extends State<WorldPage> {
                               Row(
                                 mainAxisAlignment: MainAxisAlignment.end,
                                 children: [
-                                  ElevatedButton(
-                                    onPressed: () async {
-                                      acceptQuest(
-                                        context,
-                                        data["character"]["char_id"],
-                                        data["focusNpc"]["quest_id"],
-                                      );
-                                      data["acceptQuest"] =
-                                          await getAcceptQuests(
-                                            context,
-                                            widget.charId,
-                                          );
-                                    },
-                                    child: Text(
-                                      "Accept",
-                                      style: TextStyle(
-                                        fontWeight: FontWeight.bold,
+                                  if (data["focusNpc"]["quest_id"] != null)
+                                    ElevatedButton(
+                                      onPressed: () async {
+                                        acceptQuest(
+                                          context,
+                                          data["character"]["char_id"],
+                                          data["focusNpc"]["quest_id"],
+                                        );
+                                        data["acceptQuest"] =
+                                            await getAcceptQuests(
+                                              context,
+                                              widget.charId,
+                                            );
+                                      },
+                                      child: Text(
+                                        "Accept",
+                                        style: TextStyle(
+                                          fontWeight: FontWeight.bold,
+                                        ),
                                       ),
                                     ),
-                                  ),
                                 ],
                               ),
                             ]
@@ -650,7 +647,8 @@ class _UIContentsState extends State<UIContents> {
   }
 
   Widget _skillCard(Map<String, dynamic> skill, int index) {
-    bool active = widget.data["character"]["level"] + 10 >= skill["level"];
+    bool active =
+        isSkillActive(widget.data["character"]["level"], skill["level"]);
     TextStyle textStyle = TextStyle(
       fontFamily: "pixel",
       color: Colors.white.withAlpha(active ? 200 : 100),
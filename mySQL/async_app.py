@@ -0,0 +1,1546 @@
+# asyncio serving mode of app.py
+# Same routes and response shapes, served by Quart with an aiomysql pool so
+# idle sessions and open world streams do not hold a worker thread each.
+# Both servers run the SQL of queries.py and check requests and build their
+# responses with handlers.py, tests/test_async_app.py checks that they serve
+# the same routes.
+# usage: pip install quart aiomysql && python async_app.py
+# Responses are JSON only (no MessagePack, no compression).
+from quart import Quart, Response, jsonify, session, request, has_request_context
+from contextlib import asynccontextmanager
+from werkzeug.exceptions import HTTPException
+import aiomysql, pymysql, asyncio, contextvars, functools, json, os, time
+from db_pool import DeferredCommit
+from db_router import ReplicaRouter, connection_lost, parse_dsn
+from static_cache import StaticCache, STATIC_QUERIES
+from position_buffer import PositionBuffer
+from spatial_index import GridIndex
+from world_stream import WorldHub
+from metrics import Metrics
+from quest_index import AcceptedQuests
+from save_state import SaveStateCache
+from effective_stats import EffectiveStatsCache
+from progression import apply_awards
+from purge import DELETED_NICKNAME_QUERY, purge_queries, unused_stats_query
+from simulation import NPC, PLAYER, WorldSimulation
+import simulation, queries, handlers
+
+app = Quart(__name__)
+# same key as app.py, so a login session works on both servers
+app.secret_key = "game_database_modeling_class"
+
+# same as app.py: queries slower than slow_query_threshold seconds are logged
+metrics = Metrics(slow_query_threshold=0.2)
+
+db_config = {
+    "host": "127.0.0.1",
+    "user": "minirpg",
+    "password": "minirpg",
+    "db": "minirpg",
+}
+
+pool_config = {
+    "minsize": 10,
+    "maxsize": 100,
+    "pool_recycle": 3600,
+}
+
+
+# parse_dsn() gives pymysql arguments, aiomysql names the database "db"
+def aiomysql_config(dsn):
+    config = parse_dsn(dsn)
+    if "database" in config:
+        config["db"] = config.pop("database")
+    return config
+
+
+# same MINIRPG_DB_PRIMARY / MINIRPG_DB_REPLICAS and stickiness as app.py
+if os.environ.get("MINIRPG_DB_PRIMARY"):
+    db_config.update(aiomysql_config(os.environ["MINIRPG_DB_PRIMARY"]))
+replica_configs = [
+    dict(db_config, **aiomysql_config(dsn.strip()))
+    for dsn in os.environ.get("MINIRPG_DB_REPLICAS", "").split(",")
+    if dsn.strip()
+]
+READ_METHODS = {"GET", "HEAD"}
+STICKY_SECONDS = 5.0
+
+# same as app.py: user ids allowed to run the server maintenance routes
+ADMIN_USERS = {u.strip() for u in os.environ.get("MINIRPG_ADMINS", "").split(",") if u.strip()}
+
+db_pool = None
+replica_pools = []
+# replaced by the one over the opened pools in open_db()
+db_router = ReplicaRouter(None)
+static_cache = StaticCache(ttl=600)
+static_cache_lock = asyncio.Lock()
+# flushed by flush_positions_loop() instead of its own thread
+position_buffer = PositionBuffer(None, interval=1.0, max_pending=500)
+world_index = GridIndex(cell_size=256)
+world_index_lock = asyncio.Lock()
+world_hub = WorldHub(tick_rate=10, max_lag=5.0)
+accepted_quests = AcceptedQuests(max_chars=10000)
+save_states = SaveStateCache(max_chars=10000)
+stats_cache = EffectiveStatsCache(max_chars=10000)
+flush_task = None
+
+# same simulation as app.py, stepped on its own thread, off unless
+# MINIRPG_WORLD_SIM=1
+WORLD_SIM = os.environ.get("MINIRPG_WORLD_SIM", "") == "1"
+world_sim = None
+if WORLD_SIM and simulation.np is not None:
+    world_sim = WorldSimulation(
+        width=3000,
+        height=3000,
+        tick_rate=20,
+        max_items=50,
+        spawn_interval=2.0,
+        pickup_radius=50.0,
+        npc_speed=0.0,
+    )
+
+StreamCursor = metrics.async_cursor_class(aiomysql.SSDictCursor)
+
+
+async def create_pool(config):
+    # autocommit: aiomysql closes connections returned inside a transaction,
+    # so reads run without one and writes call begin() themselves
+    return await aiomysql.create_pool(
+        **config,
+        **pool_config,
+        autocommit=True,
+        cursorclass=metrics.async_cursor_class(aiomysql.DictCursor),
+    )
+
+
+def pool_stats(pool):
+    return {
+        "size": pool.size,
+        "idle": pool.freesize,
+        "in_use": pool.size - pool.freesize,
+        "minsize": pool.minsize,
+        "maxsize": pool.maxsize,
+    }
+
+
+# the pool is opened when serving starts
+def primary_pool_stats():
+    return pool_stats(db_pool) if db_pool is not None else {}
+
+
+metrics.add_gauges("db_pool", primary_pool_stats)
+metrics.add_gauges("db_router", lambda: db_router.stats())
+metrics.add_gauges("position_buffer", position_buffer.stats)
+metrics.add_gauges("world_stream", world_hub.stats)
+if world_sim is not None:
+    metrics.add_gauges("world_sim", world_sim.stats)
+metrics.add_gauges("accepted_quests", accepted_quests.stats)
+metrics.add_gauges("character_save", save_states.stats)
+metrics.add_gauges("effective_stats", stats_cache.stats)
+
+
+@app.before_serving
+async def open_db():
+    global db_pool, replica_pools, db_router, flush_task
+    db_pool = await create_pool(db_config)
+    replica_pools = [await create_pool(config) for config in replica_configs]
+    db_router = ReplicaRouter(db_pool, replica_pools, retry_after=10.0)
+    for i, pool in enumerate(replica_pools):
+        metrics.add_gauges(f"db_replica{i}_pool", functools.partial(pool_stats, pool))
+    world_hub.start()
+    if world_sim is not None:
+        world_sim.on_tick = publish_simulation
+        world_sim.start()
+    flush_task = asyncio.create_task(flush_positions_loop())
+    await get_static_data()
+
+
+@app.after_serving
+async def close_db():
+    flush_task.cancel()
+    if world_sim is not None:
+        world_sim.stop()
+    world_hub.stop()
+    await flush_buffer()
+    for pool in [db_pool] + replica_pools:
+        pool.close()
+        await pool.wait_closed()
+
+
+@app.before_request
+async def start_metrics():
+    rule = request.url_rule
+    metrics.request_started(rule.rule if rule is not None else "unmatched")
+
+
+@app.after_request
+async def finish_metrics(response):
+    metrics.request_finished(request.method, response.status_code)
+    return response
+
+
+@app.after_request
+async def mark_session_write(response):
+    if db_router.replicas and request.method not in READ_METHODS:
+        session["wrote_at"] = time.time()
+    return response
+
+
+# like app.py's acquire_db(): reads of a GET go to a replica, unless the
+# session wrote in the last STICKY_SECONDS. Decided while the request is
+# there, the connection may be taken later (stream_rows).
+def reads_replica():
+    return (
+        bool(db_router.replicas)
+        and has_request_context()
+        and request.method in READ_METHODS
+        and time.time() - session.get("wrote_at", 0) >= STICKY_SECONDS
+    )
+
+
+async def acquire_db(replica):
+    # (pool, conn)
+    if replica:
+        return await db_router.acquire_read_async()
+    return db_pool, await db_pool.acquire()
+
+
+def release_db(pool, conn, error=None):
+    if error is not None and connection_lost(error):
+        # a replica lost in the middle of a query is left out
+        db_router.failed(pool)
+    pool.release(conn)
+
+
+class BatchTransaction(DeferredCommit):
+    # The connection of a transactional /batch, every DB access of its
+    # requests runs on it. One at a time: a request may read concurrently
+    # (/bootstrap).
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.lock = asyncio.Lock()
+
+
+batch_transaction = contextvars.ContextVar("batch_transaction", default=None)
+
+
+@asynccontextmanager
+async def read_db(primary=False):
+    # primary: reads that fill the shared caches, a row from a lagging
+    # replica would be kept for everyone
+    batch = batch_transaction.get()
+    if batch is not None:
+        async with batch.lock:
+            yield batch.conn
+        return
+    pool, conn = await acquire_db(not primary and reads_replica())
+    error = None
+    try:
+        yield conn
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        release_db(pool, conn, error)
+
+
+@asynccontextmanager
+async def transaction():
+    # cursor of a primary connection, committed when the block ends and
+    # rolled back when it raises. In a transactional /batch the batch
+    # commits or rolls back at its end.
+    batch = batch_transaction.get()
+    if batch is not None:
+        async with batch.lock:
+            async with batch.conn.cursor() as cursor:
+                yield cursor
+        return
+    async with db_pool.acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cursor:
+                yield cursor
+            await conn.commit()
+            metrics.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+
+async def fetch_all(query, data_set=None, primary=False):
+    async with read_db(primary) as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, data_set)
+            return await cursor.fetchall()
+
+
+async def fetch_one(query, data_set=None, primary=False):
+    async with read_db(primary) as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, data_set)
+            return await cursor.fetchone()
+
+
+async def execute(query, data_set=None):
+    # one statement in its own transaction, returns the cursor
+    async with transaction() as cursor:
+        await cursor.execute(query, data_set)
+    return cursor
+
+
+# as in app.py, for cache entries of rows written in transaction(): in a
+# transactional /batch they are dropped now and again after it committed or
+# rolled back, so nothing read in between is kept
+def invalidate_after_commit(invalidate):
+    invalidate()
+    batch = batch_transaction.get()
+    if batch is not None:
+        batch.on_finish(invalidate)
+
+
+# fn() runs once the rows written in transaction() are committed: right away,
+# or when a transactional /batch committed, never after its rollback
+def after_commit(fn):
+    batch = batch_transaction.get()
+    if batch is not None:
+        batch.on_commit(fn)
+    else:
+        fn()
+
+
+def forget_character_state(char_id):
+    save_states.invalidate(char_id)
+    stats_cache.invalidate(char_id)
+
+
+async def get_static_data():
+    data = static_cache.fresh()
+    if data is not None:
+        return data
+    async with static_cache_lock:
+        data = static_cache.fresh()
+        if data is None:
+            data = static_cache.store(await fetch_static_data())
+        return data
+
+
+async def fetch_static_data():
+    results = {}
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            for name, query in STATIC_QUERIES:
+                await cursor.execute(query)
+                results[name] = await cursor.fetchall()
+    return results
+
+
+# same as app.py's static_response: weak ETag of the static cache content,
+# 304 without running the view when the client has it
+def static_response(view):
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        if session.get("login") is None:
+            return await view(*args, **kwargs)
+        etag = f"{(await get_static_data())['digest'][:20]}-j"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class("", status=304)
+        else:
+            response = await app.make_response(await view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
+
+
+async def get_world_index():
+    if not world_index.loaded:
+        async with world_index_lock:
+            if not world_index.loaded:
+                rows = await fetch_all(queries.SPAWNED_QUERY, primary=True)
+                rows = [position_buffer.overlay(row) for row in rows]
+                world_index.load(rows)
+                if world_sim is not None:
+                    world_sim.load(rows)
+    return world_index
+
+
+def move_player(char_id, x_pos, y_pos):
+    world_index.upsert(("player", char_id), x_pos, y_pos)
+    world_hub.publish(("player", char_id), x_pos, y_pos)
+    if world_sim is not None:
+        world_sim.set_position(PLAYER, char_id, x_pos, y_pos)
+
+
+# called from the simulation thread after every tick
+def publish_simulation(sim):
+    moved = sim.moved[sim.kind[sim.moved] == NPC]
+    if moved.size == 0:
+        return
+    changes = dict(zip(sim.keys(moved), map(tuple, sim.pos[moved].tolist())))
+    for key, (x, y) in changes.items():
+        world_index.upsert(key, x, y)
+    world_hub.publish_many(changes)
+
+
+async def flush_buffer():
+    batch = position_buffer.take()
+    if not batch:
+        return 0
+    try:
+        async with db_pool.acquire() as conn:
+            await conn.begin()
+            async with conn.cursor() as cursor:
+                await cursor.executemany(PositionBuffer.query, position_buffer.rows(batch))
+            await conn.commit()
+            metrics.commit()
+    except Exception as e:
+        position_buffer.restore(batch, e)
+        raise
+    position_buffer.flushed(batch)
+    return len(batch)
+
+
+async def flush_positions_loop():
+    while True:
+        await asyncio.sleep(position_buffer.interval)
+        try:
+            await flush_buffer()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # kept in the buffer, retried on the next interval
+            pass
+
+
+# Keyset pagination of list routes, as in app.py
+def read_page_args(after_type=int):
+    return handlers.page_args(request.args, after_type)
+
+
+def paged_response(body, rows, key, limit):
+    response = jsonify(body)
+    after = handlers.next_after(rows, key, limit)
+    if after is not None:
+        response.headers["X-Next-After"] = after
+    return response, 200
+
+
+def wants_stream():
+    return request.args.get("stream") in ("1", "true")
+
+
+# ?stream=1 as in app.py: rows of an unbuffered cursor written one by one.
+# The connection is taken when the body is first read, so a body never read
+# (HEAD, client gone) holds none, and is closed unless all rows were read.
+def stream_rows(query, data_set, prefix="[", suffix="]", convert=None):
+    replica = reads_replica()
+
+    async def generate():
+        pool, conn = await acquire_db(replica)
+        ok = False
+        try:
+            cursor = await conn.cursor(StreamCursor)
+            await cursor.execute(query, data_set)
+            yield prefix
+            first = True
+            async for row in cursor:
+                item = app.json.dumps(convert(row) if convert else row)
+                yield item if first else "," + item
+                first = False
+            await cursor.close()
+            yield suffix
+            ok = True
+        finally:
+            if not ok:
+                # rows may be left unread on it
+                conn.close()
+            release_db(pool, conn)
+
+    return Response(generate(), mimetype="application/json")
+
+
+# region Server
+@app.route("/pool/stats", methods=["GET"])
+async def get_pool_stats():
+    data = pool_stats(db_pool)
+    if replica_pools:
+        data["replicas"] = [pool_stats(pool) for pool in replica_pools]
+        data["router"] = db_router.stats()
+    return jsonify({"data": data}), 200
+
+
+@app.route("/metrics", methods=["GET"])
+async def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/cache/reload", methods=["POST"])
+async def reload_static_cache():
+    status = handlers.admin_status(session.get("login"), ADMIN_USERS)
+    if status is not None:
+        return jsonify({"message": "Denied Request"}), status
+    try:
+        async with static_cache_lock:
+            static_cache.store(await fetch_static_data())
+        return jsonify({"message": "complete to reload cache", "version": static_cache.version}), 200
+    except Exception as e:
+        return jsonify({"message": "failed to reload cache", "error": str(e)}), 500
+
+
+@app.route("/cache/info", methods=["GET"])
+async def get_static_cache_info():
+    return jsonify({"data": static_cache.info()}), 200  # endregion
+
+
+# region User
+@app.route("/register", methods=["POST"])
+async def create_user():
+    try:
+        data_set = handlers.register_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        await execute(queries.REGISTER_QUERY, data_set)
+        return (
+            jsonify({"message": "complete user register", "id": data_set[0]}),
+            201,
+        )
+    except Exception as e:
+        return jsonify({"message": "failed to register", "error": str(e)}), 500
+
+
+@app.route("/login", methods=["POST"])
+async def login():
+    if session.get("login") is not None:
+        return jsonify({"message": "already logged in user"}), 400
+    try:
+        user_id, password = handlers.login_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        row = await fetch_one(queries.LOGIN_QUERY, (user_id, user_id))
+        error = handlers.login_error(row, password)
+        if error is not None:
+            return jsonify({"message": error}), 404
+        session["login"] = row["user_id"]
+        return jsonify(handlers.login_body(row)), 200
+    except Exception as e:
+        return jsonify({"message": "failed to login", "error": str(e)}), 500
+
+
+@app.route("/login/char/<int:char_id>", methods=["PATCH"])
+async def update_last_accessed(char_id):
+    user_id = session.get("login")
+    if user_id is None or char_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        await execute(queries.LAST_ACCESSED_QUERY, (char_id, user_id))
+        return jsonify({"message": "complete to update accessed"}), 200
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to update last accessed", "error": str(e)}),
+            500,
+        )
+
+
+@app.route("/logout", methods=["GET"])
+async def logout():
+    session.clear()
+    return jsonify({"message": "complete to logout"}), 200
+
+
+@app.route("/user", methods=["GET"])
+@app.route("/user/<string:user_id>", methods=["GET"])
+async def get_user_data(user_id=None):
+    if user_id is None:
+        user_id = session.get("login")
+        if user_id is None:
+            return jsonify({"message": "No input data"}), 400
+    try:
+        data = await fetch_one(queries.USER_QUERY, (user_id,))
+        return jsonify({"data": data}), 200
+    except Exception as e:
+        return jsonify({"message": "failed to find user", "error": str(e)}), 500
+
+
+@app.route("/users", methods=["GET"])
+async def get_all_user_ids():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        limit, after = read_page_args(str)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    query, data_set = queries.users_query(limit, after)
+    if wants_stream():
+        return stream_rows(
+            query, data_set, '{"data":[', "]}", lambda user: user["user_id"]
+        )
+    try:
+        users = await fetch_all(query, data_set)
+        body = {"data": [user["user_id"] for user in users]}
+        return paged_response(body, users, "user_id", limit)
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to get all users", "error": str(e)}),
+            500,
+        )  # endregion
+
+
+# region Character list
+@app.route("/characters", methods=["GET"])
+async def get_all_characters():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        limit, after = read_page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    query, data_set = queries.characters_query(user_id, limit, after)
+    if wants_stream():
+        return stream_rows(query, data_set, '{"data":[', "]}")
+    try:
+        characters = await fetch_all(query, data_set)
+        return paged_response({"data": characters}, characters, "char_id", limit)
+    except Exception as e:
+        return jsonify({"message": "failed to get characters", "error": str(e)}), 500
+
+
+@app.route("/character/detail/<int:char_id>", methods=["GET"])
+async def get_character(char_id):
+    user_id = session.get("login")
+    if user_id is None or char_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        character = await select_character_detail(char_id, user_id)
+        if not character:
+            return jsonify({"data": None}), 404
+        else:
+            character["stats"] = (await get_effective_stats([char_id])).get(char_id)
+            return jsonify({"data": character}), 200
+    except Exception as e:
+        return jsonify({"message": "failed to get a character", "error": str(e)}), 500
+
+
+async def select_character_detail(char_id, user_id):
+    async with read_db() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(queries.CHARACTER_DETAIL_QUERY, (char_id, user_id))
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        stats = (await resolve_stats(conn, [row]))[0]
+    return handlers.character_detail(row, stats)
+
+
+# same as app.py: stat templates from the static cache plus the deltas,
+# the stat rows that are no template read in one query
+async def resolve_stats(conn, rows):
+    templates = (await get_static_data())["stat_templates"]
+    others = handlers.other_stat_ids(rows, templates)
+    if others:
+        async with conn.cursor() as cursor:
+            await cursor.execute(*queries.stat_rows_query(others))
+            others = {st["stat_id"]: st for st in await cursor.fetchall()}
+    return handlers.resolved_stats(rows, templates, others or {})
+
+
+@app.route("/character/stats", methods=["POST"])
+async def get_characters_stats():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_ids = handlers.stats_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        return jsonify({"data": await get_effective_stats(char_ids)}), 200
+    except Exception as e:
+        return jsonify({"message": "failed to get stats", "error": str(e)}), 500
+
+
+# same as app.py: cached per character, the misses read from the primary
+async def get_effective_stats(char_ids):
+    static = await get_static_data()
+    version = static["version"]
+    result = {}
+    missing = []
+    for char_id in dict.fromkeys(char_ids):
+        stats = stats_cache.get(char_id, version)
+        if stats is None:
+            missing.append(char_id)
+        else:
+            result[char_id] = stats
+    if not missing:
+        return result
+
+    base_query, item_query = queries.effective_stats_queries(missing)
+    async with read_db(primary=True) as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(*base_query)
+            bases = await cursor.fetchall()
+            await cursor.execute(*item_query)
+            item_rows = await cursor.fetchall()
+        resolved = await resolve_stats(conn, bases)
+    computed = handlers.effective_stats(static, bases, resolved, item_rows)
+    for char_id, stats in computed.items():
+        stats_cache.put(char_id, version, stats)
+    result.update(computed)
+    return result
+
+
+@app.route("/character/create", methods=["POST"])
+async def create_character():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        data = handlers.character_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        template = await get_stat_template(data["class_id"])
+        data_set = handlers.character_row(user_id, data, template)
+        purged = []
+        async with transaction() as cursor:
+            try:
+                await cursor.execute(queries.INSERT_CHARACTER_QUERY, data_set)
+            except pymysql.err.IntegrityError:
+                # the nickname of a deleted character is free before its purge too
+                purged = await purge_deleted_nickname(cursor, data["nickname"])
+                if not purged:
+                    raise
+                await cursor.execute(queries.INSERT_CHARACTER_QUERY, data_set)
+            inserted_id = cursor.lastrowid
+        after_commit(functools.partial(forget_purged, purged))
+        return (
+            jsonify({"message": "complete to create character", "id": inserted_id}),
+            201,
+        )
+    except pymysql.err.IntegrityError:
+        return jsonify({"message": f"{data['nickname']} is already exist"}), 400
+    except Exception as e:
+        return jsonify({"message": "failed to create character", "error": str(e)}), 500
+
+
+# purges the deleted characters with the nickname in the cursor's transaction,
+# returns their char_ids for forget_purged() once it is committed
+async def purge_deleted_nickname(cursor, nickname):
+    await cursor.execute(DELETED_NICKNAME_QUERY, (nickname,))
+    rows = await cursor.fetchall()
+    char_ids = [row["char_id"] for row in rows]
+    if not char_ids:
+        return char_ids
+    for query, data_set in purge_queries(char_ids):
+        await cursor.execute(query, data_set)
+    await cursor.execute(*unused_stats_query([row["stat_id"] for row in rows]))
+    return char_ids
+
+
+# purged characters leave the in-process caches, as in app.py
+def forget_purged(char_ids):
+    for char_id in char_ids:
+        forget_character_state(char_id)
+        accepted_quests.invalidate(char_id)
+        world_index.remove(("player", char_id))
+        if world_sim is not None:
+            world_sim.remove(PLAYER, char_id)
+
+
+async def get_stat_template(class_id):
+    return handlers.stat_template(await get_static_data(), class_id)
+
+
+@app.route("/character/create/bulk", methods=["POST"])
+async def create_characters_bulk():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        characters = handlers.bulk_character_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        data_set = [
+            handlers.character_row(user_id, c, await get_stat_template(c["class_id"]))
+            for c in characters
+        ]
+        async with transaction() as cursor:
+            await cursor.executemany(queries.INSERT_CHARACTER_QUERY, data_set)
+        return (
+            jsonify({"message": "complete to create characters", "count": len(data_set)}),
+            201,
+        )
+    except pymysql.err.IntegrityError as e:
+        return jsonify({"message": "nickname is already exist", "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": "failed to create characters", "error": str(e)}), 500
+
+
+@app.route("/character/<int:char_id>", methods=["DELETE"])
+async def delete_character(char_id):
+    user_id = session.get("login")
+    if user_id is None or char_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        await execute(queries.DELETE_CHARACTER_QUERY, (char_id, user_id))
+        return jsonify({"message": "complete to delete character"}), 201
+    except Exception as e:
+        return jsonify({"message": "failed to delete character", "error": str(e)}), 500
+
+
+@app.route("/character/update", methods=["PATCH"])
+async def update_character_data():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        data_set = handlers.update_args(await request.get_json(silent=True), user_id)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        await execute(queries.UPDATE_CHARACTER_QUERY, data_set)
+        invalidate_after_commit(functools.partial(forget_character_state, data_set[4]))
+        return jsonify({"message": "complete to save char data"}), 200
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to save char data", "error": str(e)}),
+            500,
+        )
+
+
+# same as app.py: written only when changed and only over the client's version
+# (not in a transactional /batch, see handlers.BATCH_NOT_TRANSACTIONAL)
+@app.route("/character/save", methods=["POST"])
+async def save_character_data():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, version, state, position = handlers.save_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        async with db_pool.acquire() as conn:
+            saved = save_states.get(char_id)
+            if handlers.needs_select(saved, user_id, version):
+                saved = await select_save_state(conn, char_id, user_id)
+                if saved is None:
+                    return jsonify({"message": "cannot find character"}), 404
+            written = False
+            if handlers.needs_write(saved, version, state):
+                written = await update_save_state(conn, char_id, user_id, version, state)
+                if written and handlers.level_changed(saved, state):
+                    stats_cache.invalidate(char_id)
+                if not written:
+                    # written by someone else since it was cached
+                    saved = await select_save_state(conn, char_id, user_id)
+                    if saved is None:
+                        return jsonify({"message": "cannot find character"}), 404
+        if saved[1] != version:
+            return (
+                jsonify({"message": "stale character data", "data": handlers.save_state_body(saved)}),
+                409,
+            )
+        save_states.count(written)
+    except Exception as e:
+        return jsonify({"message": "failed to save char data", "error": str(e)}), 500
+    if written:
+        version += 1
+    if position is not None and handlers.moved(world_index.position(("player", char_id)), position):
+        position_buffer.put(char_id, *position)
+        move_player(char_id, *position)
+    return (
+        jsonify({"message": "complete to save char data", "version": version, "written": written}),
+        200,
+    )
+
+
+async def select_save_state(conn, char_id, user_id):
+    async with conn.cursor() as cursor:
+        await cursor.execute(queries.SAVE_STATE_QUERY, (char_id, user_id))
+        row = await cursor.fetchone()
+    if row is None:
+        return None
+    saved = handlers.saved_state(row, user_id)
+    save_states.put(char_id, *saved)
+    return saved
+
+
+# one statement, committed by autocommit. False when the version in DB is
+# not the given one anymore
+async def update_save_state(conn, char_id, user_id, version, state):
+    async with conn.cursor() as cursor:
+        await cursor.execute(*queries.update_save_state_query(char_id, user_id, version, state))
+        if cursor.rowcount == 0:
+            return False
+    save_states.put(char_id, user_id, version + 1, state)
+    return True  # endregion
+
+
+# region Character Class
+@app.route("/class/<int:class_id>", methods=["GET"])
+@static_response
+async def get_specific_class(class_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        data = (await get_static_data())["classes"].get(class_id)
+        result = {"data": data, "message": "complete to select class"}
+    except Exception as e:
+        result = {"message": "failed to select a class", "error": str(e)}
+    if result.get("data") != None:
+        return jsonify(result), 200
+    else:
+        return jsonify(result), 500
+
+
+@app.route("/class/all", methods=["GET"])
+@static_response
+async def get_all_class():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        return jsonify((await get_static_data())["class_tree"]), 200
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to get all classes", "error": str(e)}),
+            500,
+        )  # endregion
+
+
+# region Stat
+@app.route("/stat/<int:stat_id>", methods=["GET"])
+async def get_stat(stat_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        data = await fetch_one(*queries.stat_query(stat_id))
+        result = {"data": data, "message": "complete to select stat"}
+    except Exception as e:
+        result = {"message": "failed to select stat", "error": str(e)}
+    if result.get("data") != None:
+        return jsonify(result), 200
+    else:
+        return jsonify(result), 500
+
+
+@app.route("/stat", methods=["POST"])
+async def create_stat():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    data_set = handlers.stat_args(await request.get_json(silent=True))
+    try:
+        cursor = await execute(queries.INSERT_STAT_QUERY, data_set)
+        return jsonify({"message": "complete to create stat", "id": cursor.lastrowid}), 201
+    except Exception as e:
+        return jsonify({"message": "failed to create stat", "error": str(e)}), 500  # endregion
+
+
+# region Skill
+@app.route("/class/skills/<int:class_id>", methods=["GET"])
+@static_response
+async def get_skills_for_class(class_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        skills = (await get_static_data())["skills"].get(class_id, [])
+        return jsonify({"data": skills}), 200
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to get skills", "error": str(e)}),
+            500,
+        )  # endregion
+
+
+# region Max Exp
+@app.route("/exp/<int:class_id>", methods=["GET"])
+@static_response
+async def get_max_exp_for_class(class_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        exps = (await get_static_data())["max_exp"].get(class_id, [])
+        return jsonify(exps), 200
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to get Max EXP", "error": str(e)}),
+            500,
+        )  # endregion
+
+
+# region Progression
+# same as app.py: admins only, exp and coin are 0 ~ AWARD_MAX
+@app.route("/progression/award", methods=["POST"])
+async def award_characters():
+    status = handlers.admin_status(session.get("login"), ADMIN_USERS)
+    if status is not None:
+        return jsonify({"message": "Denied Request"}), status
+    try:
+        awards = handlers.award_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        async with transaction() as cursor:
+            result = await award_progress(cursor, awards)
+        forget_awarded(result)
+        return jsonify({"data": result}), 200
+    except Exception as e:
+        return jsonify({"message": "failed to award", "error": str(e)}), 500
+
+
+# app.py's award_progress() in the cursor's transaction
+async def award_progress(cursor, awards, user_id=None):
+    totals = handlers.award_totals(awards)
+    curves = (await get_static_data())["curves"]
+    await cursor.execute(*queries.award_select_query(totals, user_id))
+    rows = apply_awards(await cursor.fetchall(), totals, curves)
+    if not rows:
+        return {}
+    await cursor.execute(*queries.award_update_query(rows))
+    return handlers.award_result(rows)
+
+
+# drop the cached state of characters award_progress changed, after commit
+def forget_awarded(result):
+    def invalidate():
+        for char_id, row in result.items():
+            save_states.invalidate(char_id)
+            if row["level_up"]:
+                stats_cache.invalidate(char_id)
+
+    invalidate_after_commit(invalidate)  # endregion
+
+
+# region World
+@app.route("/world/<string:et>/<int:id>", methods=["GET"])
+async def get_specific_world_data(et, id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        data = await fetch_one(queries.WORLD_ENTITY_QUERY, (et, id))
+        return jsonify(position_buffer.overlay(data)), 200
+    except Exception as e:
+        return jsonify({"message": "failed to get World data", "error": str(e)}), 500
+
+
+@app.route("/world/all/<int:id>", methods=["GET"])
+async def get_world_data(id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        return jsonify(await select_world_data(id)), 200
+    except Exception as e:
+        return jsonify({"message": "failed to get World Datas", "error": str(e)}), 500
+
+
+async def select_world_data(id):
+    datas = await fetch_all(queries.WORLD_DATA_QUERY, (id,))
+    return handlers.world_data(datas, position_buffer.overlay)
+
+
+@app.route("/world/player_add", methods=["POST"])
+async def insert_player_world_data():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, x_pos, y_pos = handlers.position_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        await execute(queries.PLAYER_ADD_QUERY, (char_id, x_pos, y_pos))
+        move_player(char_id, x_pos, y_pos)
+        return (
+            jsonify({"message": "complete to add player position"}),
+            201,
+        )
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to add player position", "error": str(e)}),
+            500,
+        )
+
+
+@app.route("/world/update", methods=["PATCH"])
+async def update_user_position():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, x_pos, y_pos = handlers.position_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    position_buffer.put(char_id, x_pos, y_pos)
+    move_player(char_id, x_pos, y_pos)
+    return jsonify({"message": "complete to update position"}), 200
+
+
+@app.route("/world/nearby/<int:char_id>", methods=["GET"])
+async def get_nearby_world_data(char_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        radius = handlers.radius_arg(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        index = await get_world_index()
+        center = index.position(("player", char_id))
+        if center is None:
+            return jsonify({"message": "cannot find player position"}), 404
+        npcs = (await get_static_data())["npcs"]
+        entries = index.query(center[0], center[1], radius)
+        return jsonify(handlers.nearby_body(entries, char_id, npcs)), 200
+    except Exception as e:
+        return jsonify({"message": "failed to get nearby World data", "error": str(e)}), 500
+
+
+@app.route("/world/stream/<int:char_id>", methods=["GET"])
+async def stream_world_data(char_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        npcs = (await get_static_data())["npcs"]
+        index = await get_world_index()
+        snapshot = [handlers.world_entity_row(key, pos, npcs) for key, pos in index.items()]
+    except Exception as e:
+        return jsonify({"message": "failed to get World Datas", "error": str(e)}), 500
+
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+
+    # called from the hub thread
+    def notify():
+        try:
+            loop.call_soon_threadsafe(ready.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+    sub = world_hub.subscribe(char_id, notify)
+    if sub is None:
+        return jsonify({"message": "too many world streams"}), 503
+    own_key = ("player", char_id)
+
+    async def events():
+        try:
+            yield sse_event("snapshot", {"tick": world_hub.tick, "entities": snapshot})
+            while True:
+                try:
+                    await asyncio.wait_for(ready.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                ready.clear()
+                delta = world_hub.take(sub)
+                if delta is None:
+                    break
+                entities = handlers.delta_entities(delta, own_key)
+                if entities:
+                    yield sse_event("delta", {"tick": world_hub.tick, "entities": entities})
+        finally:
+            world_hub.unsubscribe(sub)
+
+    response = Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.timeout = None
+    return response
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.route("/world/stream/stats", methods=["GET"])
+async def get_world_stream_stats():
+    return jsonify({"data": world_hub.stats()}), 200
+
+
+@app.route("/world/flush", methods=["POST"])
+async def flush_positions():
+    status = handlers.admin_status(session.get("login"), ADMIN_USERS)
+    if status is not None:
+        return jsonify({"message": "Denied Request"}), status
+    try:
+        count = await flush_buffer()
+        return jsonify({"message": "complete to flush positions", "count": count}), 200
+    except Exception as e:
+        return jsonify({"message": "failed to flush positions", "error": str(e)}), 500
+
+
+@app.route("/world/buffer/stats", methods=["GET"])
+async def get_position_buffer_stats():
+    return jsonify({"data": position_buffer.stats()}), 200
+
+
+@app.route("/world/items/<int:char_id>", methods=["GET"])
+async def get_nearby_items(char_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    if world_sim is None:
+        return jsonify({"message": "simulation is not running"}), 503
+    try:
+        radius = handlers.radius_arg(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    center = world_index.position(("player", char_id))
+    if center is None:
+        return jsonify({"message": "player is not in the world"}), 404
+    items = world_sim.items_near(center[0], center[1], radius)
+    return jsonify(handlers.items_body(items)), 200
+
+
+@app.route("/world/pickups/<int:char_id>", methods=["POST"])
+async def claim_pickups(char_id):
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    if world_sim is None:
+        return jsonify({"message": "simulation is not running"}), 503
+    count = world_sim.claim_pickups(char_id)
+    if count == 0:
+        return jsonify({"picked": 0, "coin": 0, "exp": 0}), 200
+    award = handlers.pickup_award(char_id, count)
+    try:
+        async with transaction() as cursor:
+            result = await award_progress(cursor, [award], user_id)
+    except Exception as e:
+        world_sim.give_back(char_id, count)
+        return jsonify({"message": "failed to claim pickups", "error": str(e)}), 500
+    if not result:
+        world_sim.give_back(char_id, count)
+        return jsonify({"message": "cannot find character"}), 404
+    forget_awarded(result)
+    return jsonify(handlers.pickup_body(count, award, result)), 200
+
+
+@app.route("/world/sim/stats", methods=["GET"])
+async def get_world_sim_stats():
+    if world_sim is None:
+        return jsonify({"message": "simulation is not running"}), 503
+    return jsonify({"data": world_sim.stats()}), 200  # endregion
+
+
+# region Item & Shop
+@app.route("/inventory/<int:char_id>", methods=["GET"])
+async def get_inventory_items(char_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        limit, after = read_page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if wants_stream():
+        return stream_rows(*queries.inventory_query(char_id, limit, after))
+    try:
+        data = await select_inventory(char_id, limit, after)
+        return paged_response(data, data, "item_id", limit)
+    except Exception as e:
+        return jsonify({"message": "failed to get shop data", "error": str(e)}), 500
+
+
+async def select_inventory(char_id, limit=None, after=None):
+    return await fetch_all(*queries.inventory_query(char_id, limit, after))
+
+
+@app.route("/shop", methods=["GET"])
+@static_response
+async def get_all_shop_data():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        return jsonify((await get_static_data())["shop"]), 200
+    except Exception as e:
+        return jsonify({"message": "failed to get shop data", "error": str(e)}), 500
+
+
+@app.route("/buy", methods=["POST"])
+async def insert_inventory():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, items = handlers.buy_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return await buy_items(char_id, user_id, items)
+
+
+@app.route("/buy/cart", methods=["POST"])
+async def insert_inventory_cart():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, items = handlers.cart_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return await buy_items(char_id, user_id, items)
+
+
+async def buy_items(char_id, user_id, items):
+    try:
+        counts = handlers.cart_counts(items)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    add_data_set = [(char_id, item_id, count) for item_id, count in counts.items()]
+    try:
+        async with transaction() as cursor:
+            # nothing is written when the character cannot pay the whole cart
+            await cursor.execute(*queries.buy_query(char_id, user_id, counts))
+            paid = cursor.rowcount > 0
+            if paid:
+                await cursor.executemany(queries.ADD_ITEM_QUERY, add_data_set)
+                await cursor.execute(queries.VERSION_QUERY, (char_id,))
+                version = (await cursor.fetchone())["version"]
+    except Exception as e:
+        return jsonify({"message": "failed to buy Item", "error": str(e)}), 500
+    if not paid:
+        return jsonify({"message": "not enough coin or item is not on sale"}), 400
+    invalidate_after_commit(functools.partial(forget_character_state, char_id))
+    return jsonify({"message": "complete Buy Item", "version": version}), 201
+
+
+@app.route("/inventory/equip", methods=["PATCH"])
+async def equip_item():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, item_id, equip = handlers.equip_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        async with transaction() as cursor:
+            await cursor.execute(queries.EQUIP_QUERY, (equip, char_id, item_id, user_id))
+            found = cursor.rowcount > 0
+            if not found:
+                # unchanged, or no such equipment
+                await cursor.execute(queries.EQUIPMENT_QUERY, (char_id, item_id, user_id))
+                found = await cursor.fetchone() is not None
+    except Exception as e:
+        return jsonify({"message": "failed to equip item", "error": str(e)}), 500
+    if not found:
+        return jsonify({"message": "cannot find equipment"}), 404
+    invalidate_after_commit(functools.partial(stats_cache.invalidate, char_id))
+    return jsonify({"message": "complete to equip item", "equip": equip}), 200  # endregion
+
+
+# region Quest
+@app.route("/quest/<int:npc_id>", methods=["GET"])
+async def get_random_quest(npc_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    char_id = request.args.get("char_id", type=int)
+    try:
+        quests = (await get_static_data())["quests"].get(npc_id)
+        accepted = ()
+        if char_id is not None:
+            accepted = accepted_quests.peek(char_id)
+            if accepted is None:
+                rows = await fetch_all(
+                    queries.ACCEPTED_QUEST_IDS_QUERY, (char_id,), primary=True
+                )
+                accepted = accepted_quests.put(char_id, [r["quest_id"] for r in rows])
+        quest = quests.pick(accepted) if quests is not None else None
+    except Exception as e:
+        return jsonify({"message": "failed to get quest", "error": str(e)}), 500
+    if quest is None:
+        return jsonify({"message": "no quest to give"}), 404
+    return jsonify(quest), 200
+
+
+@app.route("/quest/accept", methods=["POST"])
+async def accept_quest():
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        char_id, quest_id = handlers.accept_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        await execute(queries.ACCEPT_QUEST_QUERY, (char_id, quest_id))
+        if batch_transaction.get() is not None:
+            # a transactional /batch may still roll it back
+            invalidate_after_commit(functools.partial(accepted_quests.invalidate, char_id))
+        else:
+            accepted_quests.add(char_id, quest_id)
+        return (
+            jsonify({"message": "complete to accept quest"}),
+            201,
+        )
+    except Exception as e:
+        return jsonify({"message": "failed to accept quest", "error": str(e)}), 500
+
+
+# same as app.py: rewards of all completions in one bulk update
+@app.route("/quest/complete", methods=["POST"])
+async def complete_quests():
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        pairs = handlers.completion_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        async with transaction() as cursor:
+            await cursor.execute(*queries.completable_quests_query(pairs, user_id))
+            rows = await cursor.fetchall()
+            if rows:
+                completed, awards = handlers.quest_completions(rows)
+                await cursor.execute(*queries.complete_quests_query(completed))
+                result = await award_progress(cursor, awards, user_id)
+    except Exception as e:
+        return jsonify({"message": "failed to complete quest", "error": str(e)}), 500
+    if not rows:
+        return jsonify({"message": "no quest to complete"}), 404
+    forget_awarded(result)
+    return jsonify(handlers.completion_body(rows, result)), 200
+
+
+@app.route("/quest/accept/all/<int:char_id>", methods=["GET"])
+async def get_all_accepted_quests(char_id):
+    if session.get("login") is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        limit, after = read_page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if wants_stream():
+        return stream_rows(*queries.accepted_quests_query(char_id, limit, after))
+    try:
+        datas = await select_accepted_quests(char_id, limit, after)
+        return paged_response(datas, datas, "quest_id", limit)
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to get accepte quests", "error": str(e)}),
+            500,
+        )
+
+
+async def select_accepted_quests(char_id, limit=None, after=None):
+    return await fetch_all(*queries.accepted_quests_query(char_id, limit, after))  # endregion
+
+
+# region Bootstrap
+@app.route("/bootstrap/<int:char_id>", methods=["GET"])
+async def get_bootstrap_data(char_id):
+    user_id = session.get("login")
+    if user_id is None:
+        return jsonify({"message": "Denied Request"}), 401
+    try:
+        character = await select_character_detail(char_id, user_id)
+        if not character:
+            return jsonify({"data": None}), 404
+        # the rest runs concurrently on separate pooled connections
+        stats, world, inventory, quests = await asyncio.gather(
+            get_effective_stats([char_id]),
+            select_world_data(char_id),
+            select_inventory(char_id),
+            select_accepted_quests(char_id),
+        )
+        data = handlers.bootstrap_body(
+            await get_static_data(), character, stats, world, inventory, quests
+        )
+        return jsonify({"data": data}), 200
+    except Exception as e:
+        return (
+            jsonify({"message": "failed to get bootstrap data", "error": str(e)}),
+            500,
+        )  # endregion
+
+
+# region Batch
+# same as app.py: several API requests in one HTTP call, with
+# "transaction": true all of them in one transaction on one connection
+@app.route("/batch", methods=["POST"])
+async def run_batch():
+    try:
+        items, transactional = handlers.batch_args(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    batch = token = None
+    if transactional:
+        conn = await db_pool.acquire()
+        batch = BatchTransaction(conn)
+        token = batch_transaction.set(batch)
+    results = []
+    failed = False
+    committed = False
+    try:
+        if batch is not None:
+            await conn.begin()
+        for item in items:
+            if failed and transactional:
+                results.append(
+                    {"status": 424, "body": {"message": "skipped by failed request"}}
+                )
+                continue
+            status, body = await dispatch_batch_item(item, transactional)
+            results.append({"status": status, "body": body})
+            failed = failed or status >= 400
+        if batch is not None:
+            if failed:
+                await conn.rollback()
+            else:
+                await conn.commit()
+                metrics.commit()
+                committed = True
+    except Exception as e:
+        if batch is not None:
+            await conn.rollback()
+        return jsonify({"message": "failed to run batch", "error": str(e)}), 500
+    finally:
+        if batch is not None:
+            batch_transaction.reset(token)
+            db_pool.release(conn)
+            batch.finish(committed)
+    return jsonify({"data": results, "committed": transactional and not failed}), 200
+
+
+async def dispatch_batch_item(item, transactional=False):
+    try:
+        method, path, body = handlers.batch_item_args(item)
+    except ValueError as e:
+        return 400, {"message": str(e)}
+    ctx = app.test_request_context(
+        path,
+        method=method,
+        # sub responses are read back as JSON
+        headers={"Accept": "application/json"},
+        **({} if body is None else {"json": body}),
+    )
+    # share the login session of the batch
+    ctx.session = session._get_current_object()
+    async with ctx:
+        rule = request.url_rule
+        denied = rule and handlers.batch_item_denied(rule.endpoint, path, transactional)
+        if denied:
+            return 400, {"message": denied}
+        try:
+            rv = await app.preprocess_request()
+            if rv is None:
+                rv = await app.dispatch_request()
+        except HTTPException as e:
+            rv = jsonify({"message": e.description}), e.code
+        except Exception as e:
+            try:
+                rv = await app.handle_user_exception(e)
+            except Exception:
+                rv = jsonify({"message": "failed to run request", "error": str(e)}), 500
+        response = await app.process_response(await app.make_response(rv))
+        body = await response.get_json(silent=True)
+        if body is None:
+            body = await response.get_data(as_text=True)
+        return response.status_code, body  # endregion
+
+
+if __name__ == "__main__":
+    app.run(port=5001)
@@ -0,0 +1,65 @@
+# Serialization cost per route payload: Flask's default JSON vs FastJSONProvider
+# usage: python bench_json.py [--number 2000]
+import argparse, datetime, decimal, timeit
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from json_provider import FastJSONProvider
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def payloads():
+    # shaped like the responses of app.py, sized like a busy server
+    stat = {"stat_id": 4, "hp": 0, "atk": 40, "def": 0, "speed": 0, "atk_range": 0, "atk_speed": 0}
+    skill = {
+        "level": 10, "name": "Shield Attack", "description": "Effect Stuns enemy",
+        "img": "bash.png", "cooltime": 10, "target": "enemy", "target_count": 3,
+        "type": "damage", **stat,
+    }
+    item = {"item_id": 2, "type": "weapon", "name": "Poison Dagger", "description": "Adds poison damage", "img": "poison_dag.png"}
+    npc = {
+        "entity_type": "npc", "entity_id": 1, "x_pos": 544, "y_pos": 424, "spawn_flag": 1,
+        "npc_id": 1, "name": "Mr.Seo", "career": "First NPC", "entity_img": "mr_seo.png",
+        "detail_img": "mr_seo_detail.png",
+    }
+    character = {
+        "char_id": 1, "nickname": "player", "gender": "none", "level": 12, "coin": 1500,
+        "exp": 320, "created_at": NOW, "class_name": "knight", "class_color": "FF8833",
+    }
+    quest = {
+        "char_id": 1, "quest_id": 1, "accepted_at": NOW, "completed_at": None, "npc_id": 1,
+        "npc_talk": "Hi guy, You have to take 10 coins to grow yourself.", "need_count": 10,
+        "reward_coin": 50, "reward_exp": 60,
+    }
+    return {
+        "/class/all": {c: {"name": "warrior", "color": "FF3636", "child": [{"id": c + 4, "name": "knight", "color": "FF8833"}] * 2} for c in range(1, 5)},
+        "/class/skills/<id>": {"data": [skill] * 3},
+        "/exp/<id>": [{"level": lv, "exp": lv * 50} for lv in (1, 5, 10, 15, 30, 60)],
+        "/shop": [{**item, "price": 1000}] * 9,
+        "/inventory/<id>": [{**item, "count": 3, "equip_flag": 0}] * 30,
+        "/characters": {"data": [character] * 20},
+        "/quest/accept/all/<id>": [quest] * 50,
+        "/world/all/<id>": {"npc": [npc] * 1000, "player": {**npc, "entity_type": "player"}},
+        "/buy (Decimal)": {"total": decimal.Decimal(3000), "rows": [decimal.Decimal("1.5")] * 100},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"flask": DefaultJSONProvider(app), "fast": FastJSONProvider(app)}
+    print(f"{'route':28} {'flask us':>10} {'fast us':>10} {'speedup':>8}")
+    with app.app_context():
+        for route, obj in payloads().items():
+            cost = {}
+            for name, provider in providers.items():
+                seconds = timeit.timeit(lambda: provider.response(obj), number=args.number)
+                cost[name] = seconds / args.number * 1e6
+            print(f"{route:28} {cost['flask']:>10.1f} {cost['fast']:>10.1f} {cost['flask'] / cost['fast']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
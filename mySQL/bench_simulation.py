@@ -0,0 +1,62 @@
+# Tick time of the world simulation with a crowded world
+# usage: python bench_simulation.py [--npcs 20000] [--items 20000] [--players 2000] [--ticks 200]
+import argparse, time
+from simulation import NPC, PLAYER, WorldSimulation
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--npcs", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--tick-rate", type=int, default=20)
+    parser.add_argument("--npc-speed", type=float, default=60.0)
+    parser.add_argument("--size", type=int, default=30000, help="map width and height")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sim = WorldSimulation(
+        width=args.size,
+        height=args.size,
+        tick_rate=args.tick_rate,
+        max_items=args.items,
+        spawn_interval=1.0 / args.tick_rate,
+        npc_speed=args.npc_speed,
+        player_ttl=None,
+        seed=args.seed,
+    )
+    rng = sim.rng
+    for i in range(args.npcs):
+        x, y = rng.random(2) * args.size
+        sim.set_position(NPC, i + 1, x, y)
+    players = rng.random((args.players, 2)) * args.size
+    for i, (x, y) in enumerate(players):
+        sim.set_position(PLAYER, i + 1, x, y)
+    sim.spawn_items(args.items)
+
+    times = []
+    picked = 0
+    for _ in range(args.ticks):
+        # players walk like autosaving clients
+        players += rng.uniform(-10, 10, players.shape)
+        for i in rng.choice(args.players, args.players // 10, replace=False):
+            sim.set_position(PLAYER, int(i) + 1, *players[i])
+        start = time.perf_counter()
+        picked += sum(sim.step().values())
+        times.append((time.perf_counter() - start) * 1000)
+
+    times.sort()
+    budget = 1000 / args.tick_rate
+    stats = sim.stats()
+    print(f"entities: {stats['npcs']} npcs, {stats['items']} items, {stats['players']} players")
+    print(f"{args.ticks} ticks, {picked} pickups")
+    print(
+        f"tick ms: mean {sum(times) / len(times):.2f}  p50 {times[len(times) // 2]:.2f}"
+        f"  p99 {times[int(len(times) * 0.99) - 1]:.2f}  max {times[-1]:.2f}"
+        f"  (budget {budget:.1f} at {args.tick_rate} ticks/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import gzip, threading, zlib
+
+
+class Compressor:
+    # gzip/deflate for response bodies of at least min_size bytes.
+    # Responses that are the same for everyone (static game data) pass a
+    # cache_key and are compressed once per key and encoding, later requests
+    # get the stored bytes. The key must change when the data does.
+    def __init__(self, min_size=1024, level=6, max_cached=256):
+        self.min_size = min_size
+        self.level = level
+        self.max_cached = max_cached
+
+        self._cache = {}  # (cache_key, mimetype, encoding) -> bytes
+        self._lock = threading.Lock()
+
+        self._compressed = 0
+        self._hits = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def choose(self, accept_encodings):
+        return accept_encodings.best_match(("gzip", "deflate"))
+
+    def compress(self, data, encoding):
+        if encoding == "gzip":
+            return gzip.compress(data, self.level, mtime=0)
+        # HTTP "deflate" is the zlib format
+        return zlib.compress(data, self.level)
+
+    def apply(self, response, accept_encodings, cache_key=None):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = self.choose(accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        if cache_key is not None and response.status_code == 200:
+            body = self._cached((cache_key, response.mimetype, encoding), data, encoding)
+        else:
+            body = self.compress(data, encoding)
+            with self._lock:
+                self._compressed += 1
+        with self._lock:
+            self._bytes_in += len(data)
+            self._bytes_out += len(body)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "compressed": self._compressed,
+                "cache_hits": self._hits,
+                "cached": len(self._cache),
+                "bytes_in": self._bytes_in,
+                "bytes_out": self._bytes_out,
+            }
+
+    def _cached(self, key, data, encoding):
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._hits += 1
+                return body
+        body = self.compress(data, encoding)
+        with self._lock:
+            if len(self._cache) >= self.max_cached:
+                # keys of old cache versions pile up, start over
+                self._cache.clear()
+            self._cache[key] = body
+            self._compressed += 1
+        return body
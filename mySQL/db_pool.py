@@ -0,0 +1,213 @@
+import threading, time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Bounded, thread-safe pool of DB connections.
+    # size: connections kept open while idle
+    # max_overflow: extra connections opened under load, closed when returned
+    # timeout: seconds a checkout waits before PoolTimeout is raised
+    # recycle: seconds after which a connection is replaced (None: never)
+    # ping_interval: idle seconds after which a connection is pinged on checkout
+    def __init__(
+        self,
+        connect,
+        size=10,
+        max_overflow=5,
+        timeout=5.0,
+        recycle=3600,
+        ping_interval=30,
+    ):
+        if size < 1 or max_overflow < 0:
+            raise ValueError("invalid pool size")
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conn, created_at, last_used)
+        self._in_use = {}  # id(conn) -> created_at
+        self._opened = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._lock:
+            while True:
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                    break
+                if self._opened < self.size + self.max_overflow:
+                    # reserve a slot, connect outside of the lock
+                    self._opened += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"no connection available within {self.timeout}s"
+                    )
+                waited = True
+                self._lock.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._forget_slot()
+                raise
+            created_at = time.monotonic()
+        else:
+            conn, created_at = self._check_health(conn, created_at, last_used)
+
+        wait = time.monotonic() - start
+        with self._lock:
+            self._in_use[id(conn)] = created_at
+            self._checkouts += 1
+            self._wait_time += wait
+            if waited:
+                self._waits += 1
+            if wait > self._max_wait_time:
+                self._max_wait_time = wait
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._lock:
+            created_at = self._in_use.pop(id(conn), None)
+        if created_at is None:
+            return
+
+        if not discard:
+            # end the request's transaction so the next borrower
+            # does not see a stale snapshot or hold its locks
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._lock:
+            idle_full = len(self._idle) >= self.size
+            if discard or idle_full or self._expired(created_at):
+                self._opened -= 1
+                if discard:
+                    self._discarded += 1
+                close = True
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+                close = False
+            self._lock.notify()
+        if close:
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "opened": self._opened,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "overflow": max(0, self._opened - self.size),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_max": round(self._max_wait_time, 6),
+                "wait_time_avg": (
+                    round(self._wait_time / self._checkouts, 6)
+                    if self._checkouts
+                    else 0.0
+                ),
+            }
+
+    def close(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._opened -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def _check_health(self, conn, created_at, last_used):
+        now = time.monotonic()
+        healthy = not self._expired(created_at)
+        if healthy and now - last_used >= self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                healthy = False
+        if healthy:
+            return conn, created_at
+
+        with self._lock:
+            self._discarded += 1
+        self._close(conn)
+        try:
+            return self._connect(), time.monotonic()
+        except Exception:
+            self._forget_slot()
+            raise
+
+    def _expired(self, created_at):
+        return self.recycle is not None and time.monotonic() - created_at >= self.recycle
+
+    def _forget_slot(self):
+        with self._lock:
+            self._opened -= 1
+            self._lock.notify()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class DeferredCommit:
+    # Connection wrapper to run several handlers in one transaction.
+    # Their commit() calls are ignored, whoever owns the wrapper commits or
+    # rolls back the real connection at the end, then calls finish().
+    def __init__(self, conn):
+        self.conn = conn
+        self._on_finish = []
+        self._on_commit = []
+
+    def commit(self):
+        pass
+
+    def on_finish(self, fn):
+        # fn() runs once the real connection was committed or rolled back
+        self._on_finish.append(fn)
+
+    def on_commit(self, fn):
+        # fn() runs once the real connection was committed, not after a rollback
+        self._on_commit.append(fn)
+
+    def finish(self, committed=False):
+        callbacks, self._on_finish = self._on_finish, []
+        if committed:
+            callbacks += self._on_commit
+        self._on_commit = []
+        for fn in callbacks:
+            fn()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
@@ -0,0 +1,94 @@
+import threading
+
+STAT_FIELDS = ("hp", "atk", "def", "speed", "atk_range", "atk_speed")
+# stat raised by item.effect_value while an item of the type is equipped
+ITEM_EFFECT_STAT = {"weapon": "atk", "armor": "def"}
+
+
+# stat_delta columns of a character query, next to the stat_id of its template
+DELTA_COLUMNS = ", ".join(f"d.{f} AS delta_{f}" for f in STAT_FIELDS)
+
+
+def add_stats(total, row):
+    for f in STAT_FIELDS:
+        total[f] += row.get(f) or 0
+
+
+def with_delta(template, row):
+    # template stats plus the delta_ columns of a character row
+    return {f: (template.get(f) or 0) + (row.get(f"delta_{f}") or 0) for f in STAT_FIELDS}
+
+
+# A skill is active once the character is at most SKILL_LEVEL_MARGIN levels
+# below it: character level + 10 >= skill level. The client uses the same
+# rule (SKILL_LEVEL_MARGIN in lib/constant.dart) to enable the skill cards.
+SKILL_LEVEL_MARGIN = 10
+
+
+def skill_active(skill, level):
+    return level + SKILL_LEVEL_MARGIN >= (skill.get("level") or 0)
+
+
+def compute(base, equipped, skills, level):
+    # base: stat row of the character
+    # equipped: [{type, effect_value}] of equipped items
+    # skills: skill rows of the class (with their stat values), the active
+    #         buff skills (skill_active) are counted
+    items = dict.fromkeys(STAT_FIELDS, 0)
+    for item in equipped:
+        stat = ITEM_EFFECT_STAT.get(item["type"])
+        if stat is not None:
+            items[stat] += item.get("effect_value") or 0
+    buffs = dict.fromkeys(STAT_FIELDS, 0)
+    for skill in skills:
+        if skill.get("type") == "buff" and skill_active(skill, level):
+            add_stats(buffs, skill)
+    total = {f: base.get(f) or 0 for f in STAT_FIELDS}
+    add_stats(total, items)
+    add_stats(total, buffs)
+    return {
+        "base": {f: base.get(f) or 0 for f in STAT_FIELDS},
+        "items": items,
+        "buffs": buffs,
+        "total": total,
+    }
+
+
+class EffectiveStatsCache:
+    # Computed stats per character, tagged with the static cache version
+    # they were computed with (skill stats come from there).
+    # Equip changes, purchases and level changes must invalidate.
+    def __init__(self, max_chars=10000):
+        self.max_chars = max_chars
+        self._stats = {}  # char_id -> (static_version, stats)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, char_id, static_version):
+        entry = self._stats.get(char_id)
+        hit = entry is not None and entry[0] == static_version
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return entry[1] if hit else None
+
+    def put(self, char_id, static_version, stats):
+        with self._lock:
+            if char_id not in self._stats and len(self._stats) >= self.max_chars:
+                # drop the character computed longest ago
+                self._stats.pop(next(iter(self._stats)))
+            self._stats[char_id] = (static_version, stats)
+
+    def invalidate(self, char_id):
+        with self._lock:
+            self._stats.pop(char_id, None)
+
+    def stats(self):
+        return {
+            "characters": len(self._stats),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
@@ -0,0 +1,518 @@
+# Request checks and response bodies of the routes, shared by app.py and
+# async_app.py so the two servers cannot answer differently. Nothing here
+# runs SQL or touches the web framework: a server passes the JSON body (or
+# the query args) in, runs the SQL of queries.py and builds its response
+# from the rows with these.
+# *_args() raise ValueError with the message of the 400 response.
+import math
+from effective_stats import compute, with_delta
+from progression import valid_award
+from save_state import SAVE_FIELDS
+import queries
+
+MISSING = "missing input parameters"
+PAGE_LIMIT_MAX = 1000
+RADIUS_MAX = 5000
+STATS_LIMIT = 500
+CHARACTER_BULK_LIMIT = 5000
+AWARD_LIMIT = 500
+BATCH_LIMIT = 50
+# a picked up item of the world simulation gives ITEM_COIN coin and ITEM_EXP exp
+ITEM_COIN = 10
+ITEM_EXP = 120
+
+# routes (endpoint names) that cannot run inside a /batch
+BATCH_DENIED = {"run_batch", "stream_world_data", "static"}
+# routes with effects a rollback cannot undo (position buffer, world index,
+# simulation, static cache), not allowed in a transactional /batch
+BATCH_NOT_TRANSACTIONAL = {
+    "update_user_position",
+    "save_character_data",
+    "insert_player_world_data",
+    "claim_pickups",
+    "flush_positions",
+    "reload_static_cache",
+}
+
+
+# the JSON body as a dict, {} when there is none
+def body_of(data):
+    return data if isinstance(data, dict) else {}
+
+
+# status of the "Denied Request" answer of a maintenance route, None for admins
+def admin_status(user_id, admins):
+    if user_id is None:
+        return 401
+    if user_id not in admins:
+        return 403
+    return None
+
+
+# region Args
+# (limit, after) of ?limit=N&after=<key of the last row> in the request args,
+# ValueError when given but invalid
+def page_args(args, after_type=int):
+    limit = args.get("limit", type=int)
+    after = args.get("after", type=after_type)
+    if "limit" in args and (limit is None or not 1 <= limit <= PAGE_LIMIT_MAX):
+        raise ValueError(f"limit must be 1 ~ {PAGE_LIMIT_MAX}")
+    if "after" in args and after is None:
+        raise ValueError("invalid after")
+    return limit, after
+
+
+# the X-Next-After header of a page, None on the last one
+def next_after(rows, key, limit):
+    if limit is not None and len(rows) == limit:
+        return str(rows[-1][key])
+    return None
+
+
+# ?radius= of the world search routes, 1000 when not given,
+# ValueError when not a number in (0, RADIUS_MAX] ("nan", "inf", "abc")
+def radius_arg(args, default=1000.0):
+    if "radius" not in args:
+        return default
+    try:
+        radius = float(args["radius"])
+    except ValueError:
+        raise ValueError("invalid radius") from None
+    if not math.isfinite(radius) or not 0 < radius <= RADIUS_MAX:
+        raise ValueError(f"radius must be 0 ~ {RADIUS_MAX}")
+    return radius
+
+
+# data_set of REGISTER_QUERY
+def register_args(data):
+    data = body_of(data)
+    user_id, email, password = data.get("user_id"), data.get("email"), data.get("password")
+    if user_id is None or not email or not password:
+        raise ValueError(MISSING)
+    return user_id, password, email
+
+
+# (user_id, password), the user_id may be an email too
+def login_args(data):
+    data = body_of(data)
+    user_id, password = data.get("user_id"), data.get("password")
+    if not password or user_id is None:
+        raise ValueError("invalid login arguments")
+    return user_id, password
+
+
+def stats_args(data):
+    char_ids = body_of(data).get("char_ids")
+    if (
+        not isinstance(char_ids, list)
+        or not char_ids
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in char_ids)
+    ):
+        raise ValueError(MISSING)
+    if len(char_ids) > STATS_LIMIT:
+        raise ValueError(f"at most {STATS_LIMIT} characters")
+    return char_ids
+
+
+# {class_id, nickname, gender} of a new character
+def character_args(data):
+    data = body_of(data)
+    if not data.get("class_id") or not data.get("nickname"):
+        raise ValueError(MISSING)
+    return data
+
+
+def bulk_character_args(data):
+    characters = body_of(data).get("characters")
+    if not isinstance(characters, list) or not characters:
+        raise ValueError(MISSING)
+    if len(characters) > CHARACTER_BULK_LIMIT:
+        raise ValueError(f"too many characters, limit is {CHARACTER_BULK_LIMIT}")
+    for c in characters:
+        if not isinstance(c, dict) or not c.get("class_id") or not c.get("nickname"):
+            raise ValueError(MISSING)
+    return characters
+
+
+# data_set of UPDATE_CHARACTER_QUERY
+def update_args(data, user_id):
+    data = body_of(data)
+    values = tuple(data.get(c) for c in ("level", "coin", "exp", "hp", "char_id"))
+    if None in values:
+        raise ValueError(MISSING)
+    return values + (user_id,)
+
+
+# (char_id, version, state, position) of /character/save, state being the
+# SAVE_FIELDS values and position (x, y) or None
+def save_args(data):
+    data = body_of(data)
+    char_id, version = data.get("char_id"), data.get("version")
+    state = tuple(data.get(f) for f in SAVE_FIELDS)
+    if char_id is None or version is None or None in state:
+        raise ValueError(MISSING)
+    position = (data.get("x"), data.get("y"))
+    return char_id, version, state, None if None in position else position
+
+
+# data_set of INSERT_STAT_QUERY
+def stat_args(data):
+    data = body_of(data)
+    return tuple(data.get(c) for c in ("hp", "atk", "def", "speed", "atk_range", "atk_speed"))
+
+
+def award_args(data):
+    awards = body_of(data).get("awards")
+    if not isinstance(awards, list) or not awards:
+        raise ValueError(MISSING)
+    if len(awards) > AWARD_LIMIT:
+        raise ValueError(f"at most {AWARD_LIMIT} awards")
+    if not all(valid_award(award) for award in awards):
+        raise ValueError("invalid award")
+    return awards
+
+
+# (char_id, x, y) of /world/player_add and /world/update
+def position_args(data):
+    data = body_of(data)
+    values = (data.get("id"), data.get("x"), data.get("y"))
+    if None in values:
+        raise ValueError(MISSING)
+    return values
+
+
+# (char_id, items) of /buy
+def buy_args(data):
+    data = body_of(data)
+    char_id, item_id = data.get("char_id"), data.get("item_id")
+    if char_id is None or item_id is None:
+        raise ValueError(MISSING)
+    return char_id, [{"item_id": item_id, "count": data.get("count", 1)}]
+
+
+# (char_id, items) of /buy/cart
+def cart_args(data):
+    data = body_of(data)
+    char_id, items = data.get("char_id"), data.get("items")
+    if char_id is None or not isinstance(items, list) or not items:
+        raise ValueError(MISSING)
+    return char_id, items
+
+
+# {item_id: count} of cart items [{item_id, count}], ValueError when one is invalid
+def cart_counts(items):
+    counts = {}
+    for item in items:
+        item_id = item.get("item_id") if isinstance(item, dict) else None
+        count = item.get("count", 1) if isinstance(item, dict) else None
+        if (
+            not isinstance(item_id, int)
+            or not isinstance(count, int)
+            or isinstance(count, bool)
+            or count < 1
+        ):
+            raise ValueError("invalid item or count")
+        counts[item_id] = counts.get(item_id, 0) + count
+    return counts
+
+
+# (char_id, item_id, equip)
+def equip_args(data):
+    data = body_of(data)
+    char_id, item_id, equip = data.get("char_id"), data.get("item_id"), data.get("equip", True)
+    if char_id is None or item_id is None or not isinstance(equip, bool):
+        raise ValueError(MISSING)
+    return char_id, item_id, equip
+
+
+# data_set of ACCEPT_QUEST_QUERY
+def accept_args(data):
+    data = body_of(data)
+    values = (data.get("char_id"), data.get("quest_id"))
+    if None in values:
+        raise ValueError(MISSING)
+    return values
+
+
+# distinct [(char_id, quest_id)] of {"completions": [{char_id, quest_id}]}
+def completion_args(data):
+    completions = body_of(data).get("completions")
+    if not isinstance(completions, list) or not completions:
+        raise ValueError(MISSING)
+    if len(completions) > AWARD_LIMIT:
+        raise ValueError(f"at most {AWARD_LIMIT} completions")
+    pairs = []
+    for item in completions:
+        if (
+            not isinstance(item, dict)
+            or not isinstance(item.get("char_id"), int)
+            or not isinstance(item.get("quest_id"), int)
+        ):
+            raise ValueError("invalid completion")
+        pairs.append((item["char_id"], item["quest_id"]))
+    return list(dict.fromkeys(pairs))
+
+
+# (requests, transaction) of /batch
+def batch_args(data):
+    data = body_of(data)
+    items = data.get("requests")
+    if not isinstance(items, list) or not items:
+        raise ValueError(MISSING)
+    if len(items) > BATCH_LIMIT:
+        raise ValueError(f"too many requests, limit is {BATCH_LIMIT}")
+    return items, bool(data.get("transaction"))
+
+
+# (method, path, body) of one request of a /batch, body None without one
+def batch_item_args(item):
+    if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+        raise ValueError(MISSING)
+    return str(item.get("method", "GET")).upper(), item["path"], item.get("body")
+
+
+# the message when the endpoint of a batch item may not run, None when it may
+def batch_item_denied(endpoint, path, transaction):
+    if endpoint in BATCH_DENIED:
+        return f"{path} is not allowed in batch"
+    if transaction and endpoint in BATCH_NOT_TRANSACTIONAL:
+        return f"{path} is not allowed in transactional batch"
+    return None  # endregion
+
+
+# region User
+# the message of the 404 of /login with the LOGIN_QUERY row, None when it matches
+def login_error(row, password):
+    if row is None:
+        return "cannot find user"
+    if row["password"] != password:
+        return "Invalid Password"
+    return None
+
+
+def login_body(row):
+    return {"message": "complete to login", "last_char": row.get("last_accessed_char")}  # endregion
+
+
+# region Character
+# the class_stat template new characters of the class share (stat_id, hp),
+# what differs per character goes to stat_delta
+def stat_template(static, class_id, level=10):
+    template = static["class_stats"].get((class_id, level))
+    if template is None:
+        raise ValueError(f"no stat template for class {class_id}")
+    return template
+
+
+# data_set of INSERT_CHARACTER_QUERY
+def character_row(user_id, character, template):
+    return (
+        user_id,
+        character["class_id"],
+        character["nickname"],
+        character.get("gender"),
+        template["stat_id"],
+        template["hp"],
+    )
+
+
+# stat_ids of character rows that are no shared template, made before
+# templates were shared, to read from DB in one query
+def other_stat_ids(rows, templates):
+    return {row["stat_id"] for row in rows if row["stat_id"] not in templates}
+
+
+# Stats of character rows (stat_id and the DELTA_COLUMNS), in the same order:
+# the template or the other stat row ({stat_id: row}) plus the delta
+def resolved_stats(rows, templates, others):
+    return [
+        with_delta(templates.get(row["stat_id"]) or others.get(row["stat_id"], {}), row)
+        for row in rows
+    ]
+
+
+# /character/detail of the CHARACTER_DETAIL_QUERY row and its resolved stats
+def character_detail(row, stats):
+    stats = dict(stats)
+    character = {c: row[c] for c in queries.CHARACTER_DETAIL_COLUMNS if c != "stat_id"}
+    character["max_hp"] = stats.pop("hp")
+    character.update(stats)
+    return character
+
+
+# {char_id: stats} of the effective stats queries: the base rows, their
+# resolved stats and the equipped item rows
+def effective_stats(static, bases, resolved, item_rows):
+    equipped = {}
+    for row in item_rows:
+        equipped.setdefault(row["char_id"], []).append(row)
+    return {
+        row["char_id"]: compute(
+            base,
+            equipped.get(row["char_id"], []),
+            static["skills"].get(row["class_id"], []),
+            row["level"],
+        )
+        for row, base in zip(bases, resolved)
+    }
+
+
+# (user_id, version, state) of a SAVE_STATE_QUERY row, as kept by save_states
+def saved_state(row, user_id):
+    return (user_id, row["version"], tuple(row[f] for f in SAVE_FIELDS))
+
+
+# The cached state is only trusted when it is the one the client saves over:
+# another worker or server may have written it since it was cached, only the
+# version in DB decides a 409
+def needs_select(saved, user_id, version):
+    return saved is None or saved[0] != user_id or saved[1] != version
+
+
+# written only when it differs and only over the version the client has
+def needs_write(saved, version, state):
+    return saved[1] == version and saved[2] != state
+
+
+# level up, buff skills of the new level count
+def level_changed(saved, state):
+    return saved[2][0] != state[0]
+
+
+def save_state_body(saved):
+    body = dict(zip(SAVE_FIELDS, saved[2]))
+    body["version"] = saved[1]
+    return body
+
+
+# the position of a save goes to the buffer only when the player moved
+def moved(current, position):
+    return current != (float(position[0]), float(position[1]))  # endregion
+
+
+# region Progression
+# {char_id: (exp, coin)} of [{char_id, exp, coin}], a character awarded more
+# than once gets the sum
+def award_totals(awards):
+    totals = {}
+    for award in awards:
+        exp, coin = totals.get(award["char_id"], (0, 0))
+        totals[award["char_id"]] = (
+            exp + award.get("exp", 0),
+            coin + award.get("coin", 0),
+        )
+    return totals
+
+
+# {char_id: {level, exp, coin, level_up, version}} of the apply_awards() rows
+# written by award_update_query()
+def award_result(rows):
+    return {
+        row["char_id"]: {
+            "level": row["level"],
+            "exp": row["exp"],
+            "coin": row["coin"],
+            "level_up": row["level_up"],
+            "version": row["version"] + 1,
+        }
+        for row in rows
+    }
+
+
+def pickup_award(char_id, count):
+    return {"char_id": char_id, "exp": count * ITEM_EXP, "coin": count * ITEM_COIN}
+
+
+def pickup_body(count, award, result):
+    row = result[award["char_id"]]
+    return {
+        "picked": count,
+        "coin": award["coin"],
+        "exp": award["exp"],
+        "level": row["level"],
+        "version": row["version"],
+    }  # endregion
+
+
+# region Quest
+# the pairs of complete_quests_query() and the awards of the
+# completable_quests_query() rows
+def quest_completions(rows):
+    pairs = [(row["char_id"], row["quest_id"]) for row in rows]
+    awards = [
+        {"char_id": row["char_id"], "exp": row["reward_exp"] or 0, "coin": row["reward_coin"] or 0}
+        for row in rows
+    ]
+    return pairs, awards
+
+
+def completion_body(rows, result):
+    completed = [{"char_id": row["char_id"], "quest_id": row["quest_id"]} for row in rows]
+    return {"completed": completed, "data": result}  # endregion
+
+
+# region World
+# /world/all of the WORLD_DATA_QUERY rows, overlay() adds the buffered
+# position of the player
+def world_data(rows, overlay):
+    result = {"npc": [], "player": None}
+    for row in rows:
+        if row["entity_type"] == "npc":
+            result["npc"].append(row)
+        else:
+            player = overlay(row)
+            for key in ("npc_id", "name", "career", "entity_img", "detail_img"):
+                del player[key]
+            result["player"] = player
+    return result
+
+
+def world_entity_row(key, pos, npcs=None):
+    et, entity_id = key
+    row = {"entity_type": et, "entity_id": entity_id, "x_pos": pos[0], "y_pos": pos[1]}
+    if npcs is not None:
+        row["spawn_flag"] = 1
+        if et == "npc":
+            row.update(npcs.get(entity_id, {}))
+    return row
+
+
+# /world/nearby of the index entries around the player, without the player
+def nearby_body(entries, char_id, npcs):
+    result = {"npc": [], "player": []}
+    for key, pos in entries:
+        if key != ("player", char_id):
+            result[key[0]].append(world_entity_row(key, pos, npcs))
+    return result
+
+
+# the "delta" event entities of the stream of own_key
+def delta_entities(delta, own_key):
+    return [world_entity_row(key, pos) for key, pos in delta.items() if key != own_key]
+
+
+def items_body(items):
+    return [{"item_id": i, "x_pos": x, "y_pos": y} for i, x, y in items]  # endregion
+
+
+# region Bootstrap
+# Max EXP curve of a class on top of its parent class's curve
+def merged_max_exp(static, class_id):
+    curve = static["curves"].get(class_id)
+    return curve.points if curve is not None else []
+
+
+def bootstrap_body(static, character, stats, world, inventory, quests):
+    class_id = character["class_id"]
+    class_data = dict(static["classes"].get(class_id) or {})
+    class_data.pop("open_flag", None)
+    class_data["skills"] = static["skills"].get(class_id, [])
+    character["stats"] = stats.get(character["char_id"])
+    return {
+        "character": character,
+        "class": class_data,
+        "maxExp": merged_max_exp(static, class_id),
+        "world": world,
+        "inventory": inventory,
+        "acceptQuest": quests,
+    }  # endregion
@@ -0,0 +1,89 @@
+import datetime, decimal
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # falls back to Flask's json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+def default(o):
+    # types orjson does not encode by itself
+    if isinstance(o, decimal.Decimal):
+        # SUM() and DECIMAL columns come back as Decimal
+        return int(o) if o == o.to_integral_value() else float(o)
+    if isinstance(o, datetime.timedelta):
+        return o.total_seconds()
+    if isinstance(o, (bytes, bytearray)):
+        return o.decode()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def msgpack_default(o):
+    if isinstance(o, (datetime.date, datetime.time)):
+        # same text as the JSON responses
+        return o.isoformat()
+    return default(o)
+
+
+def packb(obj):
+    return msgpack.packb(obj, default=msgpack_default, use_bin_type=True)
+
+
+def wants_msgpack():
+    if msgpack is None or not has_request_context():
+        return False
+    best = request.accept_mimetypes.best_match(("application/json", MSGPACK_MIMETYPE))
+    return best == MSGPACK_MIMETYPE
+
+
+def dumps_bytes(obj, sort_keys=False):
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=default, option=option)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # orjson based JSON for every response.
+    # datetime goes out as ISO 8601 and Decimal as a number, and keys are not
+    # sorted. Without orjson installed this is Flask's default provider.
+    # Clients sending "Accept: application/msgpack" get the same data as
+    # MessagePack (when msgpack is installed).
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.sort_keys).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if wants_msgpack():
+            obj = self._prepare_response_obj(args, kwargs)
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        elif orjson is None:
+            response = super().response(*args, **kwargs)
+        else:
+            obj = self._prepare_response_obj(args, kwargs)
+            # bytes straight into the response, no str round trip
+            response = self._app.response_class(
+                dumps_bytes(obj, self.sort_keys), mimetype=self.mimetype
+            )
+        if msgpack is not None:
+            response.vary.add("Accept")
+        return response
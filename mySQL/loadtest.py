@@ -0,0 +1,267 @@
+# Load test for the Flask API, replaying the play sessions of the Flutter client.
+# usage:
+#   python loadtest.py --start-server --concurrency 20 --duration 60 --output result.json
+#   python loadtest.py --base-url http://127.0.0.1:5000 --compare old.json
+#   python loadtest.py --side-by-side --concurrency 200   (app.py vs async_app.py)
+# Needs a MySQL populated with populated_db.sql (see README).
+import argparse, http.cookiejar, json, math, os, random, subprocess, sys, threading, time
+import urllib.error, urllib.request
+
+
+class Recorder:
+    def __init__(self):
+        self.latency = {}  # route -> [seconds]
+        self.errors = {}  # route -> count
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, ok):
+        with self._lock:
+            self.latency.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+class Session:
+    # one player with its own cookie jar, like one running client
+    def __init__(self, base_url, recorder, timeout=10):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def call(self, method, path, route=None, body=None, expected=()):
+        # expected: non 2xx statuses that are a normal answer of the route
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as res:
+                status, raw = res.status, res.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except OSError:
+            status, raw = 0, b""
+        self.recorder.add(
+            f"{method} {route or path}",
+            time.perf_counter() - start,
+            200 <= status < 300 or status in expected,
+        )
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+
+def play(session, name, deadline, rng):
+    # register -> login -> create/select character -> enter world -> play
+    password = "loadtest"
+    session.call("POST", "/register", body={"user_id": name, "email": f"{name}@load.test", "password": password})
+    status, _ = session.call("POST", "/login", body={"user_id": name, "password": password})
+    if status != 200:
+        return
+    class_id = rng.randint(5, 12)
+    status, body = session.call(
+        "POST", "/character/create",
+        body={"class_id": class_id, "nickname": name, "gender": "none"},
+    )
+    session.call("GET", "/characters")
+    if status != 201:
+        return
+    char_id = body["id"]
+
+    session.call("PATCH", f"/login/char/{char_id}", "/login/char/<id>")
+    session.call("GET", f"/world/player/{char_id}", "/world/player/<id>")
+    x, y = 1500 + rng.randint(-500, 500), 1500 + rng.randint(-500, 500)
+    session.call("POST", "/world/player_add", body={"id": char_id, "x": x, "y": y})
+    status, body = session.call("GET", f"/bootstrap/{char_id}", "/bootstrap/<id>")
+    character = (body or {}).get("data", {}).get("character") or {
+        "char_id": char_id, "level": 1, "coin": 0, "exp": 0, "hp": 100,
+    }
+
+    while time.monotonic() < deadline:
+        roll = rng.random()
+        if roll < 0.6:
+            # autosave of the world page
+            x += rng.randint(-40, 40)
+            y += rng.randint(-40, 40)
+            character["coin"] += 10
+            character["exp"] += 120
+            status, body = session.call("POST", "/character/save", body={
+                "char_id": char_id,
+                "version": character.get("version", 0),
+                "level": character["level"],
+                "coin": character["coin"],
+                "exp": character["exp"],
+                "hp": character["hp"],
+                "x": x,
+                "y": y,
+            })
+            if status == 200:
+                character["version"] = body["version"]
+            elif status == 409:
+                character.update(body["data"])
+        elif roll < 0.75:
+            session.call("GET", "/shop")
+            session.call("GET", f"/inventory/{char_id}", "/inventory/<id>")
+            status, body = session.call(
+                "POST", "/buy", body={"char_id": char_id, "item_id": rng.randint(2, 9), "count": 1}
+            )
+            if status == 201:
+                character["version"] = body["version"]
+        elif roll < 0.9:
+            status, quest = session.call(
+                "GET", f"/quest/{rng.randint(1, 3)}?char_id={char_id}", "/quest/<npc_id>",
+                expected=(404,),
+            )
+            if status == 200 and quest:
+                session.call("POST", "/quest/accept", body={"char_id": char_id, "quest_id": quest["quest_id"]})
+            session.call("GET", f"/quest/accept/all/{char_id}", "/quest/accept/all/<id>")
+        else:
+            session.call("GET", f"/world/all/{char_id}", "/world/all/<id>")
+        time.sleep(rng.uniform(0, 0.05))
+    session.call("GET", "/logout")
+
+
+def percentile(values, p):
+    # nearest rank
+    if not values:
+        return None
+    values = sorted(values)
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    total = 0
+    for route, values in sorted(recorder.latency.items()):
+        total += len(values)
+        routes[route] = {
+            "count": len(values),
+            "errors": recorder.errors.get(route, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    return {"elapsed": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2), "routes": routes}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+SERVERS = {
+    "sync": "from app import app; app.run(port={port}, threaded=True)",
+    "async": "from async_app import app; app.run(port={port})",
+}
+
+
+def start_server(port, code):
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = code.format(port=port)
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=here)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + "/pool/stats", timeout=1).close()
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+
+def print_report(result, baseline=None):
+    old_routes = (baseline or {}).get("routes", {})
+    print(f"{result['requests']} requests in {result['elapsed']}s, {result['rps']} req/s")
+    print(f"{'route':40} {'count':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, r in result["routes"].items():
+        line = f"{route:40} {r['count']:>7} {r['errors']:>5} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}"
+        old = old_routes.get(route)
+        if old and old["p95_ms"]:
+            line += f"  p95 {(r['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100:+.1f}%"
+        print(line)
+
+
+def run(args, server=None):
+    proc = None
+    base_url = args.base_url
+    if server is not None:
+        proc, base_url = start_server(args.port, SERVERS[server])
+    try:
+        recorder = Recorder()
+        run_id = f"lt{int(time.time())}"
+        start = time.monotonic()
+        deadline = start + args.duration
+        threads = [
+            threading.Thread(
+                target=play,
+                args=(Session(base_url, recorder), f"{run_id}_{i}", deadline, random.Random(args.seed + i)),
+            )
+            for i in range(args.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        result = summarize(recorder, time.monotonic() - start)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    result.update({
+        "commit": git_commit(),
+        "server": server,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "seed": args.seed,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini RPG API load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--start-server", action="store_true", help="run the --server app on --port for the test")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="sync")
+    parser.add_argument("--side-by-side", action="store_true", help="run the sync and then the async server, and compare")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="save result as JSON")
+    parser.add_argument("--compare", help="JSON result of an earlier run")
+    args = parser.parse_args()
+
+    if args.side_by_side:
+        result = {"sync": run(args, "sync"), "async": run(args, "async")}
+        print("[sync]")
+        print_report(result["sync"])
+        print("[async] change against sync")
+        print_report(result["async"], result["sync"])
+    else:
+        result = run(args, args.server if args.start_server else None)
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
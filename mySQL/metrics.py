@@ -0,0 +1,263 @@
+import contextvars, logging, threading, time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50)
+
+slow_query_log = logging.getLogger("minirpg.slow_query")
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestState:
+    # the request being measured, outer: the /batch running it as sub request
+    def __init__(self, route, outer=None):
+        self.route = route
+        self.outer = outer
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+
+
+class Metrics:
+    # Request and DB query metrics, rendered in Prometheus text format.
+    # Queries are charged to the route of the request running in the same
+    # context (thread or asyncio task), queries from background threads to
+    # route="background".
+    def __init__(self, prefix="minirpg", slow_query_threshold=None):
+        self.prefix = prefix
+        self.enabled = True
+        self.slow_query_threshold = slow_query_threshold
+        self._current = contextvars.ContextVar(f"{prefix}_request", default=None)
+        self._lock = threading.Lock()
+        self._gauges = []
+
+        self._requests = {}  # (route, method, status) -> count
+        self._latency = {}  # (route, method) -> Histogram
+        self._errors = {}  # (route, method) -> count
+        self._queries_per_request = {}  # route -> Histogram
+        self._query_time_per_request = {}  # route -> Histogram
+        self._queries = {}  # route -> count
+        self._query_errors = {}  # route -> count
+        self._rows = {}  # route -> count
+        self._commits = {}  # route -> count
+        self._slow_queries = 0
+
+    def add_gauges(self, name, collect):
+        # collect() returns {key: number}, rendered as name_key
+        self._gauges.append((name, collect))
+
+    def request_started(self, route):
+        # a sub request of /batch, the batch goes on after it
+        self._current.set(RequestState(route, self._current.get()))
+
+    def request_finished(self, method, status):
+        state = self._current.get()
+        if state is None:
+            return
+        self._current.set(state.outer)
+        route, queries, query_time = state.route, state.queries, state.query_time
+        if state.outer is not None:
+            # the queries of a sub request count to its batch too
+            state.outer.queries += queries
+            state.outer.query_time += query_time
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - state.start
+        with self._lock:
+            key = (route, method)
+            self._inc(self._requests, (route, method, status))
+            self._histogram(self._latency, key, LATENCY_BUCKETS).observe(elapsed)
+            if status >= 500:
+                self._inc(self._errors, key)
+            self._histogram(
+                self._queries_per_request, route, QUERY_COUNT_BUCKETS
+            ).observe(queries)
+            self._histogram(
+                self._query_time_per_request, route, LATENCY_BUCKETS
+            ).observe(query_time)
+
+    def query(self, sql, seconds, rows, error=False):
+        if not self.enabled:
+            return
+        state = self._current.get()
+        if state is None:
+            route = "background"
+        else:
+            route = state.route
+            state.queries += 1
+            state.query_time += seconds
+        slow = (
+            self.slow_query_threshold is not None
+            and seconds >= self.slow_query_threshold
+        )
+        with self._lock:
+            self._inc(self._queries, route)
+            if error:
+                self._inc(self._query_errors, route)
+            if rows:
+                self._inc(self._rows, route, rows)
+            if slow:
+                self._slow_queries += 1
+        if slow:
+            slow_query_log.warning("%.3fs [%s] %s", seconds, route, " ".join(sql.split()))
+
+    def commit(self):
+        if not self.enabled:
+            return
+        state = self._current.get()
+        route = state.route if state is not None else "background"
+        with self._lock:
+            self._inc(self._commits, route)
+
+    def cursor_class(self, base):
+        metrics = self
+
+        class MetricsCursor(base):
+            def execute(self, query, args=None):
+                start = time.perf_counter()
+                try:
+                    result = super().execute(query, args)
+                except Exception:
+                    metrics.query(query, time.perf_counter() - start, 0, error=True)
+                    raise
+                metrics.query(query, time.perf_counter() - start, result_rows(self))
+                return result
+
+        return MetricsCursor
+
+    def async_cursor_class(self, base):
+        # cursor_class() of an aiomysql cursor
+        metrics = self
+
+        class MetricsCursor(base):
+            async def execute(self, query, args=None):
+                start = time.perf_counter()
+                try:
+                    result = await super().execute(query, args)
+                except Exception:
+                    metrics.query(query, time.perf_counter() - start, 0, error=True)
+                    raise
+                metrics.query(query, time.perf_counter() - start, result_rows(self))
+                return result
+
+        return MetricsCursor
+
+    def connection_class(self, base):
+        metrics = self
+
+        class MetricsConnection(base):
+            def commit(self):
+                super().commit()
+                metrics.commit()
+
+        return MetricsConnection
+
+    def render(self):
+        p = self.prefix
+        out = []
+        with self._lock:
+            self._render_counter(
+                out, f"{p}_http_requests_total", "HTTP requests.",
+                self._requests, ("route", "method", "status"),
+            )
+            self._render_histograms(
+                out, f"{p}_http_request_duration_seconds", "HTTP request latency.",
+                self._latency, ("route", "method"),
+            )
+            self._render_counter(
+                out, f"{p}_http_request_errors_total", "HTTP responses with 5xx status.",
+                self._errors, ("route", "method"),
+            )
+            self._render_histograms(
+                out, f"{p}_db_queries_per_request", "DB queries run by one request.",
+                self._queries_per_request, ("route",),
+            )
+            self._render_histograms(
+                out, f"{p}_db_query_seconds_per_request", "DB query time of one request.",
+                self._query_time_per_request, ("route",),
+            )
+            self._render_counter(
+                out, f"{p}_db_queries_total", "DB queries.", self._queries, ("route",)
+            )
+            self._render_counter(
+                out, f"{p}_db_query_errors_total", "Failed DB queries.",
+                self._query_errors, ("route",),
+            )
+            self._render_counter(
+                out, f"{p}_db_rows_total", "Rows returned by DB queries.",
+                self._rows, ("route",),
+            )
+            self._render_counter(
+                out, f"{p}_db_commits_total", "DB commits.", self._commits, ("route",)
+            )
+            out.append(f"# HELP {p}_db_slow_queries_total Queries over the slow query threshold.")
+            out.append(f"# TYPE {p}_db_slow_queries_total counter")
+            out.append(f"{p}_db_slow_queries_total {self._slow_queries}")
+        for name, collect in self._gauges:
+            for key, value in collect().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                out.append(f"# TYPE {p}_{name}_{key} gauge")
+                out.append(f"{p}_{name}_{key} {value}")
+        return "\n".join(out) + "\n"
+
+    def _inc(self, table, key, n=1):
+        table[key] = table.get(key, 0) + n
+
+    def _histogram(self, table, key, buckets):
+        h = table.get(key)
+        if h is None:
+            h = table[key] = Histogram(buckets)
+        return h
+
+    def _render_counter(self, out, name, help, table, label_names):
+        out.append(f"# HELP {name} {help}")
+        out.append(f"# TYPE {name} counter")
+        for key, value in sorted(table.items(), key=lambda kv: str(kv[0])):
+            out.append(f"{name}{labels(label_names, key)} {value}")
+
+    def _render_histograms(self, out, name, help, table, label_names):
+        out.append(f"# HELP {name} {help}")
+        out.append(f"# TYPE {name} histogram")
+        for key, h in sorted(table.items(), key=lambda kv: str(kv[0])):
+            key = key if isinstance(key, tuple) else (key,)
+            cumulative = 0
+            for bound, count in zip(h.buckets + ("+Inf",), h.counts):
+                cumulative += count
+                le = labels(label_names + ("le",), key + (bound,))
+                out.append(f"{name}_bucket{le} {cumulative}")
+            out.append(f"{name}_sum{labels(label_names, key)} {h.sum}")
+            out.append(f"{name}_count{labels(label_names, key)} {h.count}")
+
+
+def result_rows(cursor):
+    rows = cursor.rowcount if cursor.description is not None else 0
+    if rows < 0 or rows >= 2**63:
+        # unbuffered cursors do not know it before fetching
+        rows = 0
+    return rows
+
+
+def labels(names, values):
+    values = values if isinstance(values, tuple) else (values,)
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
@@ -0,0 +1,129 @@
+# Versioned schema migrations.
+# migrations/NNNN_name.sql files are applied in version order, each once,
+# and recorded in the schema_migrations table.
+# usage: python migrate.py [--status] [--to VERSION]
+import argparse, hashlib, os, re, sys
+import pymysql
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def add_db_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--user", default="minirpg")
+    parser.add_argument("--password", default="minirpg")
+    parser.add_argument("--database", default="minirpg")
+
+
+def connect(args):
+    return pymysql.connect(
+        host=args.host,
+        user=args.user,
+        password=args.password,
+        database=args.database,
+        cursorclass=pymysql.cursors.DictCursor,
+    )
+
+
+def load_migrations(path=MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(path):
+        match = FILENAME.match(filename)
+        if match is None:
+            continue
+        with open(os.path.join(path, filename), encoding="utf-8") as f:
+            sql = f.read()
+        migrations.append((int(match.group(1)), match.group(2), sql))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("duplicated migration version")
+    return migrations
+
+
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+def checksum(sql):
+    return hashlib.sha1(sql.encode()).hexdigest()
+
+
+def ensure_table(conn):
+    query = (
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        + " version INT NOT NULL, name VARCHAR(100) NOT NULL,"
+        + " checksum CHAR(40) NOT NULL, applied_at TIMESTAMP NULL DEFAULT NOW(),"
+        + " PRIMARY KEY (version))"
+    )
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+    conn.commit()
+
+
+def applied_versions(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version, checksum FROM schema_migrations")
+        return {row["version"]: row["checksum"] for row in cursor.fetchall()}
+
+
+def migrate(conn, migrations, target=None, out=print):
+    # MySQL commits DDL statements one by one, so a migration that fails
+    # halfway is not rolled back and is not recorded either
+    ensure_table(conn)
+    applied = applied_versions(conn)
+    count = 0
+    for version, name, sql in migrations:
+        if target is not None and version > target:
+            break
+        if version in applied:
+            if applied[version] != checksum(sql):
+                out(f"warning: {version:04d}_{name} changed after it was applied")
+            continue
+        out(f"apply {version:04d}_{name}")
+        with conn.cursor() as cursor:
+            for statement in split_statements(sql):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) values (%s, %s, %s)",
+                (version, name, checksum(sql)),
+            )
+        conn.commit()
+        count += 1
+    return count
+
+
+def status(conn, migrations, out=print):
+    ensure_table(conn)
+    applied = applied_versions(conn)
+    for version, name, _ in migrations:
+        out(f"{'applied' if version in applied else 'pending':8} {version:04d}_{name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini RPG schema migrations")
+    add_db_arguments(parser)
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    parser.add_argument("--to", type=int, help="apply up to this version")
+    args = parser.parse_args()
+
+    migrations = load_migrations()
+    conn = connect(args)
+    try:
+        if args.status:
+            status(conn, migrations)
+            return 0
+        count = migrate(conn, migrations, args.to)
+        print(f"{count} migration(s) applied")
+        return 0
+    except Exception as e:
+        print(f"failed to migrate: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
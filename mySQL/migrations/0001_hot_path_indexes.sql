@@ -0,0 +1,11 @@
+-- indexes for the per request lookups of app.py
+
+-- /characters: WHERE user_id = ? AND deleted_at IS NULL ORDER BY char_id
+CREATE INDEX idx_character_list_user_deleted ON character_list (user_id, deleted_at);
+
+-- skills of a class, quests of an npc
+CREATE INDEX idx_skill_class ON skill (class_id, level);
+CREATE INDEX idx_quest_npc ON quest (npc_id);
+
+-- accept_quest WHERE char_id = ? is served by its primary key (char_id, quest_id),
+-- which also gives the quest_id order of the keyset pages
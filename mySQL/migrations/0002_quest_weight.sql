@@ -0,0 +1,2 @@
+-- relative chance of an npc giving the quest, 0: never
+ALTER TABLE quest ADD COLUMN weight INT NOT NULL DEFAULT 1;
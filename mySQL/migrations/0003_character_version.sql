@@ -0,0 +1,3 @@
+-- bumped on every write of the saved character data, saves carrying an
+-- older version are rejected
+ALTER TABLE character_list ADD COLUMN version INT NOT NULL DEFAULT 0;
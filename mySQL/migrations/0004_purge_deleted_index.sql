@@ -0,0 +1,3 @@
+-- the character purge job walks soft-deleted characters by deleted_at:
+-- WHERE deleted_at < ? ORDER BY deleted_at LIMIT ?
+CREATE INDEX idx_character_list_deleted_at ON character_list (deleted_at);
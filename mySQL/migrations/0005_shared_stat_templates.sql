@@ -0,0 +1,61 @@
+-- characters refer to the stat row of their class_stat template instead of a
+-- copy of it, and only what differs from the template is kept per character
+
+-- added to the template stats of the character, no row until they differ
+CREATE TABLE stat_delta (
+	char_id	INT	NOT NULL,
+	hp	INT	NOT NULL	DEFAULT 0,
+	atk	INT	NOT NULL	DEFAULT 0,
+	def	INT	NOT NULL	DEFAULT 0,
+	speed	INT	NOT NULL	DEFAULT 0,
+	atk_range	INT	NOT NULL	DEFAULT 0,
+	atk_speed	INT	NOT NULL	DEFAULT 0,
+
+	PRIMARY KEY (char_id),
+	FOREIGN KEY (char_id) REFERENCES character_list(char_id)
+);
+
+-- the lowest stat_id of every set of identical stat rows, the templates were
+-- inserted before the character copies
+CREATE TEMPORARY TABLE stat_keep (
+	keep_id	INT	NOT NULL,
+	hp	INT	NULL,
+	atk	INT	NULL,
+	def	INT	NULL,
+	speed	INT	NULL,
+	atk_range	INT	NULL,
+	atk_speed	INT	NULL,
+
+	PRIMARY KEY (keep_id),
+	INDEX (hp, atk, def, speed, atk_range, atk_speed)
+);
+INSERT INTO stat_keep (keep_id, hp, atk, def, speed, atk_range, atk_speed)
+SELECT MIN(stat_id), hp, atk, def, speed, atk_range, atk_speed
+FROM stat GROUP BY hp, atk, def, speed, atk_range, atk_speed;
+
+CREATE TEMPORARY TABLE stat_dedupe (
+	stat_id	INT	NOT NULL,
+	keep_id	INT	NOT NULL,
+
+	PRIMARY KEY (stat_id)
+);
+INSERT INTO stat_dedupe (stat_id, keep_id)
+SELECT st.stat_id, k.keep_id
+FROM stat st JOIN stat_keep k
+	ON st.hp <=> k.hp AND st.atk <=> k.atk AND st.def <=> k.def
+	AND st.speed <=> k.speed AND st.atk_range <=> k.atk_range AND st.atk_speed <=> k.atk_speed
+WHERE st.stat_id <> k.keep_id;
+
+UPDATE character_list c JOIN stat_dedupe d ON c.stat_id = d.stat_id
+SET c.stat_id = d.keep_id;
+
+-- the copies nothing refers to anymore
+DELETE st FROM stat st
+JOIN stat_dedupe d ON st.stat_id = d.stat_id
+LEFT JOIN character_list c ON c.stat_id = st.stat_id
+LEFT JOIN class_stat cs ON cs.stat_id = st.stat_id
+LEFT JOIN skill s ON s.stat_id = st.stat_id
+WHERE c.char_id IS NULL AND cs.stat_id IS NULL AND s.skill_id IS NULL;
+
+DROP TEMPORARY TABLE stat_dedupe;
+DROP TEMPORARY TABLE stat_keep;
@@ -0,0 +1,4 @@
+-- the world index loads every spawned entity at start:
+-- SELECT entity_type, entity_id, x_pos, y_pos FROM world WHERE spawn_flag = true
+-- covered by this index (the primary key columns come with it)
+CREATE INDEX idx_world_spawn ON world (spawn_flag, x_pos, y_pos);
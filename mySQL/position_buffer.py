@@ -0,0 +1,153 @@
+import threading, time
+
+
+class PositionBuffer:
+    # Write-behind buffer for player positions.
+    # Only the latest (x, y) of every entity is kept, and the pending
+    # positions are written in one executemany every `interval` seconds
+    # or as soon as `max_pending` entities are waiting. Positions taken for a
+    # write stay readable until it is committed.
+    # Like a direct UPDATE, only existing world rows are moved: a character
+    # that never entered the world or was purged meanwhile gets no row back.
+    query = (
+        "UPDATE world SET x_pos = %s, y_pos = %s"
+        + " WHERE entity_type = 'player' AND entity_id = %s"
+    )
+
+    def __init__(self, pool, interval=1.0, max_pending=500):
+        self.pool = pool
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self._pending = {}  # entity_id -> (x, y)
+        self._inflight = {}  # entity_id -> (x, y) being written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._puts = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._last_error = None
+
+    def put(self, entity_id, x, y):
+        with self._lock:
+            self._pending[entity_id] = (x, y)
+            self._puts += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def get(self, entity_id):
+        with self._lock:
+            pos = self._pending.get(entity_id)
+            if pos is None:
+                pos = self._inflight.get(entity_id)
+            return pos
+
+    def overlay(self, row):
+        # show the unflushed position on a world row read from DB
+        if row is None or row.get("entity_type") != "player":
+            return row
+        pos = self.get(row["entity_id"])
+        if pos is not None:
+            row["x_pos"], row["y_pos"] = pos
+        return row
+
+    def flush(self):
+        # returns the number of written positions
+        with self._flush_lock:
+            batch = self.take()
+            if not batch:
+                return 0
+            conn = self.pool.acquire()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.executemany(self.query, self.rows(batch))
+                conn.commit()
+            except Exception as e:
+                self.pool.release(conn, discard=True)
+                self.restore(batch, e)
+                raise
+            self.pool.release(conn)
+            self.flushed(batch)
+            return len(batch)
+
+    # take(), rows(), restore() and flushed() let a caller with another DB
+    # driver do the write itself. Every taken batch has to end with
+    # restore() or flushed().
+    def take(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+            self._inflight.update(batch)
+        return batch
+
+    @staticmethod
+    def rows(batch):
+        return [(x, y, entity_id) for entity_id, (x, y) in batch.items()]
+
+    def restore(self, batch, error):
+        with self._lock:
+            # newer positions that arrived meanwhile win
+            for entity_id, pos in batch.items():
+                self._pending.setdefault(entity_id, pos)
+            self._land(batch)
+            self._last_error = str(error)
+
+    def flushed(self, batch):
+        with self._lock:
+            self._land(batch)
+            self._flushes += 1
+            self._flushed_rows += len(batch)
+
+    def _land(self, batch):
+        # the batch is not in flight anymore, unless a later take() has
+        # the entity again
+        for entity_id, pos in batch.items():
+            if self._inflight.get(entity_id) is pos:
+                del self._inflight[entity_id]
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="position-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        # stop the flush thread and write what is left
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "inflight": len(self._inflight),
+                "puts": self._puts,
+                "flushes": self._flushes,
+                "flushed_rows": self._flushed_rows,
+                "coalesced": self._puts - self._flushed_rows - len(self._pending),
+                "last_error": self._last_error,
+            }
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                # kept in the buffer, retried on the next interval
+                time.sleep(self.interval)
@@ -0,0 +1,100 @@
+from bisect import bisect_right
+
+# levels past the last max_exp row keep its exp, up to this level
+MAX_LEVEL = 100
+# most exp or coin a single award may give
+AWARD_MAX = 1000000
+
+
+class LevelCurve:
+    # Dense level -> exp table of one class, built from the sparse max_exp
+    # rows (exp needed for a level up from each listed level on).
+    # total[level] is the exp gathered from level 1 to reach the level, so
+    # a character's level for any amount of exp is found by bisection.
+    def __init__(self, points, max_level=MAX_LEVEL):
+        # points: [(level, exp)] sorted by level
+        self.points = [{"level": level, "exp": exp} for level, exp in points]
+        self.max_level = max_level
+        self.need = [0] * (max_level + 1)  # exp of a level up, by level
+        self.total = [0] * (max_level + 1)
+        i = 0
+        exp = points[0][1]
+        for level in range(1, max_level + 1):
+            while i < len(points) and points[i][0] <= level:
+                exp = points[i][1]
+                i += 1
+            self.need[level] = exp
+            if level > 1:
+                self.total[level] = self.total[level - 1] + self.need[level - 1]
+
+    def level_for(self, total_exp):
+        # highest level reached with total_exp gathered from level 1
+        return max(1, min(bisect_right(self.total, total_exp) - 1, self.max_level))
+
+    def add(self, level, exp, gained):
+        # (level, exp) after gaining exp, exp being the progress in the level
+        level = max(1, min(level, self.max_level))
+        total = self.total[level] + max(exp + gained, 0)
+        new_level = self.level_for(total)
+        if new_level < level:
+            # exp was taken away, no level down
+            return level, 0
+        exp = total - self.total[new_level]
+        if new_level == self.max_level:
+            # nothing to gather for anymore
+            exp = min(exp, self.need[new_level])
+        return new_level, exp
+
+
+def build_curves(classes, max_exp, max_level=MAX_LEVEL):
+    # {class_id: LevelCurve}, a child class's rows over its parent's
+    # classes: {class_id: class row}, max_exp: {class_id: [{level, exp}]}
+    curves = {}
+    for class_id, c in classes.items():
+        exps = {}
+        for owner in (c.get("include_class"), class_id):
+            for row in max_exp.get(owner, []):
+                exps[row["level"]] = row["exp"]
+        if exps:
+            curves[class_id] = LevelCurve(sorted(exps.items()), max_level)
+    return curves
+
+
+def is_amount(value):
+    # bool is an int too, true would count as 1
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= AWARD_MAX
+
+
+def valid_award(award):
+    # {char_id, exp, coin} of a request body, exp and coin default to 0
+    return (
+        isinstance(award, dict)
+        and isinstance(award.get("char_id"), int)
+        and not isinstance(award.get("char_id"), bool)
+        and is_amount(award.get("exp", 0))
+        and is_amount(award.get("coin", 0))
+    )
+
+
+def apply_awards(rows, awards, curves):
+    # rows: [{char_id, class_id, level, exp, coin}] as in DB
+    # awards: {char_id: (exp, coin)}
+    # returns the rows with level, exp and coin after the awards, and
+    # "level_up" set; classes without a curve only gather exp
+    result = []
+    for row in rows:
+        gained, coin = awards[row["char_id"]]
+        curve = curves.get(row["class_id"])
+        level, exp = row["level"], row["exp"] + gained
+        if curve is not None:
+            level, exp = curve.add(row["level"], row["exp"], gained)
+        result.append(
+            dict(
+                row,
+                level=level,
+                exp=max(exp, 0),
+                coin=max(row["coin"] + coin, 0),
+                level_up=level - row["level"],
+            )
+        )
+    return result
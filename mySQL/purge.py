@@ -0,0 +1,206 @@
+import threading, time
+
+# nickname of a deleted character still in character_list
+DELETED_NICKNAME_QUERY = (
+    "SELECT char_id, stat_id FROM character_list"
+    + " WHERE nickname = %s AND deleted_at IS NOT NULL FOR UPDATE"
+)
+# (retention seconds, batch size), the characters deleted longest ago
+EXPIRED_QUERY = (
+    "SELECT char_id, stat_id FROM character_list"
+    + " WHERE deleted_at < NOW() - INTERVAL %s SECOND"
+    + " ORDER BY deleted_at LIMIT %s FOR UPDATE"
+)
+# (after, horizon, batch size), stat rows nothing refers to in stat_id order
+UNUSED_STATS_QUERY = (
+    "SELECT st.stat_id FROM stat st"
+    + " LEFT JOIN character_list c ON c.stat_id = st.stat_id"
+    + " LEFT JOIN class_stat cs ON cs.stat_id = st.stat_id"
+    + " LEFT JOIN skill s ON s.stat_id = st.stat_id"
+    + " WHERE st.stat_id > %s AND st.stat_id <= %s"
+    + " AND c.char_id IS NULL AND cs.stat_id IS NULL AND s.skill_id IS NULL"
+    + " ORDER BY st.stat_id LIMIT %s"
+)
+
+
+def purge_queries(char_ids):
+    # (query, data_set) removing characters with the rows referring to them,
+    # in foreign key order
+    places = ", ".join(["%s"] * len(char_ids))
+    return [
+        (f"DELETE FROM world WHERE entity_type = 'player' AND entity_id IN ({places})", char_ids),
+        (f"DELETE FROM inventory WHERE char_id IN ({places})", char_ids),
+        (f"DELETE FROM accept_quest WHERE char_id IN ({places})", char_ids),
+        (f"DELETE FROM stat_delta WHERE char_id IN ({places})", char_ids),
+        (f"UPDATE user SET last_accessed_char = NULL WHERE last_accessed_char IN ({places})", char_ids),
+        (f"DELETE FROM character_list WHERE char_id IN ({places})", char_ids),
+    ]
+
+
+def unused_stats_query(stat_ids):
+    stat_ids = list(set(stat_ids))
+    places = ", ".join(["%s"] * len(stat_ids))
+    query = (
+        "DELETE st FROM stat st"
+        + " LEFT JOIN character_list c ON c.stat_id = st.stat_id"
+        + " LEFT JOIN class_stat cs ON cs.stat_id = st.stat_id"
+        + " LEFT JOIN skill s ON s.stat_id = st.stat_id"
+        + f" WHERE st.stat_id IN ({places})"
+        + " AND c.char_id IS NULL AND cs.stat_id IS NULL AND s.skill_id IS NULL"
+    )
+    return query, stat_ids
+
+
+class CharacterPurger:
+    # Background compaction of soft-deleted characters.
+    # Characters deleted more than `retention` seconds ago are removed for
+    # good with their world, inventory, accept_quest and stat_delta rows, at most
+    # `batch_size` characters per transaction. Then stat rows nothing
+    # refers to anymore are collected, also in batches.
+    # A stat row is only collected once it was already there on the
+    # previous run, so a row inserted just before its reference is safe.
+    def __init__(self, pool, retention=7 * 24 * 3600, batch_size=500, interval=600):
+        self.pool = pool
+        self.retention = retention
+        self.batch_size = batch_size
+        self.interval = interval
+        self.on_purge = None  # called with the char_ids of every purged batch
+
+        self._stat_horizon = None  # highest stat_id seen by the last run
+        self._run_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._runs = 0
+        self._characters = 0
+        self._stats = 0
+        self._last_run = None
+        self._last_error = None
+
+    def run(self):
+        # one pass over everything due, returns (characters, stat rows)
+        with self._run_lock:
+            conn = self.pool.acquire()
+            try:
+                characters = self._purge_expired(conn)
+                stats = self._collect_stats(conn)
+            except Exception as e:
+                # closing the connection rolls the open batch back
+                self.pool.release(conn, discard=True)
+                self._last_error = str(e)
+                raise
+            self.pool.release(conn)
+            self._runs += 1
+            self._last_run = time.time()
+            return characters, stats
+
+    def purge_nickname(self, conn, nickname):
+        # Frees the nickname of a deleted character right away, in the
+        # caller's transaction. Returns None when no deleted character has
+        # it, else the purge to pass to purged() once the caller committed.
+        with conn.cursor() as cursor:
+            cursor.execute(DELETED_NICKNAME_QUERY, (nickname,))
+            rows = cursor.fetchall()
+        if not rows:
+            return None
+        return self.purge_characters(conn, rows)
+
+    def purge_characters(self, conn, rows):
+        # rows: [{char_id, stat_id}] of soft-deleted characters, no commit.
+        # Returns (char_ids, deleted stat rows) for purged()
+        char_ids = [row["char_id"] for row in rows]
+        with conn.cursor() as cursor:
+            for query, data_set in purge_queries(char_ids):
+                cursor.execute(query, data_set)
+        stats = self.delete_unused_stats(conn, [row["stat_id"] for row in rows])
+        return char_ids, stats
+
+    def purged(self, char_ids, stats=0):
+        # a purge was committed: counted, and on_purge drops the characters
+        # from the caches. Not called for a rolled back one.
+        self._characters += len(char_ids)
+        self._stats += stats
+        if self.on_purge is not None:
+            self.on_purge(char_ids)
+
+    def delete_unused_stats(self, conn, stat_ids):
+        # the given stat rows that no character, class_stat or skill refers
+        # to, no commit
+        if not stat_ids:
+            return 0
+        with conn.cursor() as cursor:
+            cursor.execute(*unused_stats_query(stat_ids))
+            return cursor.rowcount
+
+    def _purge_expired(self, conn):
+        purged = 0
+        while not self._stopped.is_set():
+            with conn.cursor() as cursor:
+                cursor.execute(EXPIRED_QUERY, (self.retention, self.batch_size))
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            purge = self.purge_characters(conn, rows)
+            conn.commit()
+            self.purged(*purge)
+            purged += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        return purged
+
+    def _collect_stats(self, conn):
+        # orphaned stat rows up to the horizon of the previous run, walked
+        # in stat_id order one batch at a time
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT MAX(stat_id) AS stat_id FROM stat")
+            horizon = cursor.fetchone()["stat_id"] or 0
+        limit, self._stat_horizon = self._stat_horizon, horizon
+        if limit is None:
+            return 0
+        collected = 0
+        after = 0
+        while not self._stopped.is_set():
+            with conn.cursor() as cursor:
+                cursor.execute(UNUSED_STATS_QUERY, (after, limit, self.batch_size))
+                stat_ids = [row["stat_id"] for row in cursor.fetchall()]
+            if not stat_ids:
+                break
+            # checked again by the DELETE, a reference may have come meanwhile
+            deleted = self.delete_unused_stats(conn, stat_ids)
+            conn.commit()
+            self._stats += deleted
+            collected += deleted
+            after = stat_ids[-1]
+            if len(stat_ids) < self.batch_size:
+                break
+        return collected
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="character-purge", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "runs": self._runs,
+            "purged_characters": self._characters,
+            "collected_stats": self._stats,
+            "last_run": self._last_run,
+            "last_error": self._last_error,
+        }
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run()
+            except Exception:
+                # last_error is kept, tried again on the next interval
+                pass
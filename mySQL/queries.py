@@ -0,0 +1,289 @@
+# SQL of the per request routes, used by app.py and async_app.py and checked
+# by query_plans.py. Builders return (query, data_set).
+from effective_stats import DELTA_COLUMNS
+from save_state import SAVE_FIELDS
+
+
+def places(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# Keyset pagination of list routes, the rows after `after` ordered by key
+def keyset_query(query, data_set, key, limit, after):
+    data_set = list(data_set)
+    if after is not None:
+        query += (" AND " if " WHERE " in query else " WHERE ") + f"{key} > %s"
+        data_set.append(after)
+    query += f" ORDER BY {key}"
+    if limit is not None:
+        query += " LIMIT %s"
+        data_set.append(limit)
+    return query, data_set
+
+
+# region User
+# (user_id, password, email)
+REGISTER_QUERY = "INSERT INTO user (user_id, password, email) values (%s, %s, %s)"
+# one primary key and one unique key lookup, an id match comes first
+# (user_id, user_id)
+LOGIN_QUERY = (
+    "(SELECT user_id, password, last_accessed_char FROM user WHERE user_id = %s)"
+    + " UNION ALL"
+    + " (SELECT user_id, password, last_accessed_char FROM user WHERE email = %s)"
+    + " LIMIT 1"
+)
+# (char_id, user_id)
+LAST_ACCESSED_QUERY = (
+    "UPDATE user SET last_accessed_at = NOW(), last_accessed_char = %s WHERE user_id = %s"
+)
+USER_QUERY = "SELECT * FROM user WHERE user_id = %s"
+
+
+def users_query(limit=None, after=None):
+    return keyset_query("SELECT user_id FROM user", (), "user_id", limit, after)  # endregion
+
+
+# region Character
+CHARACTER_LIST_COLUMNS = ["char_id", "nickname", "gender", "level", "coin", "exp", "created_at"]
+CHARACTER_DETAIL_COLUMNS = [
+    "char_id",
+    "class_id",
+    "nickname",
+    "gender",
+    "level",
+    "coin",
+    "exp",
+    "hp",
+    "version",
+    "stat_id",
+]
+
+
+def characters_query(user_id, limit=None, after=None):
+    class_column = ["name as class_name", "color as class_color"]
+    query = (
+        "SELECT "
+        + ", ".join(
+            [f"c.{c}" for c in CHARACTER_LIST_COLUMNS] + [f"cl.{c}" for c in class_column]
+        )
+        + " FROM character_list c"
+        + " JOIN character_class cl ON c.class_id = cl.class_id"
+        + " WHERE c.user_id = %s AND c.deleted_at IS NULL"
+    )
+    return keyset_query(query, (user_id,), "c.char_id", limit, after)
+
+
+# (char_id, user_id), the character with its stat_delta columns
+CHARACTER_DETAIL_QUERY = (
+    "SELECT "
+    + ", ".join(f"c.{c}" for c in CHARACTER_DETAIL_COLUMNS)
+    + f", {DELTA_COLUMNS}"
+    + " FROM character_list c"
+    + " LEFT JOIN stat_delta d ON d.char_id = c.char_id"
+    + " WHERE c.char_id = %s AND c.user_id = %s AND c.deleted_at IS NULL"
+)
+# (user_id, class_id, nickname, gender, stat_id, hp), executemany for many
+INSERT_CHARACTER_QUERY = (
+    "INSERT INTO character_list (user_id, class_id, nickname, gender, stat_id, hp)"
+    + " values (%s, %s, %s, %s, %s, %s)"
+)
+# (char_id, user_id)
+DELETE_CHARACTER_QUERY = (
+    "UPDATE character_list SET deleted_at = NOW() WHERE char_id = %s AND user_id = %s"
+)
+# (level, coin, exp, hp, char_id, user_id)
+UPDATE_CHARACTER_QUERY = (
+    "UPDATE character_list SET level = %s, coin = %s, exp = %s, hp = %s,"
+    + " version = version + 1 WHERE char_id = %s AND user_id = %s"
+)
+
+
+def stat_rows_query(stat_ids):
+    stat_ids = list(stat_ids)
+    return f"SELECT * FROM stat WHERE stat_id IN ({places(stat_ids)})", stat_ids
+
+
+def stat_query(stat_id, column="*"):
+    return f"SELECT {column} FROM stat WHERE stat_id = %s", (stat_id,)
+
+
+# (hp, atk, def, speed, atk_range, atk_speed)
+INSERT_STAT_QUERY = (
+    "INSERT INTO stat (hp, atk, def, speed, atk_range, atk_speed)"
+    + " values (%s, %s, %s, %s, %s, %s)"
+)
+
+
+# (base query, equipped item query) of the effective stats, both over char_ids
+def effective_stats_queries(char_ids):
+    char_ids = list(char_ids)
+    base_query = (
+        f"SELECT c.char_id, c.class_id, c.level, c.stat_id, {DELTA_COLUMNS}"
+        + " FROM character_list c LEFT JOIN stat_delta d ON d.char_id = c.char_id"
+        + f" WHERE c.char_id IN ({places(char_ids)}) AND c.deleted_at IS NULL"
+    )
+    item_query = (
+        "SELECT i.char_id, it.type, it.effect_value"
+        + " FROM inventory i JOIN item it ON i.item_id = it.item_id"
+        + f" WHERE i.char_id IN ({places(char_ids)}) AND i.equip_flag = TRUE"
+    )
+    return (base_query, char_ids), (item_query, char_ids)
+
+
+# (char_id, user_id)
+SAVE_STATE_QUERY = (
+    f"SELECT version, {', '.join(SAVE_FIELDS)} FROM character_list"
+    + " WHERE char_id = %s AND user_id = %s AND deleted_at IS NULL"
+)
+
+
+# written only over the given version
+def update_save_state_query(char_id, user_id, version, state):
+    query = (
+        "UPDATE character_list SET "
+        + ", ".join(f"{f} = %s" for f in SAVE_FIELDS)
+        + ", version = version + 1"
+        + " WHERE char_id = %s AND user_id = %s AND deleted_at IS NULL AND version = %s"
+    )
+    return query, list(state) + [char_id, user_id, version]  # endregion
+
+
+# region Progression
+# characters to award, locked until the caller commits
+def award_select_query(char_ids, user_id=None):
+    char_ids = list(char_ids)
+    query = (
+        "SELECT char_id, class_id, level, exp, coin, version FROM character_list"
+        + f" WHERE char_id IN ({places(char_ids)}) AND deleted_at IS NULL"
+    )
+    data_set = list(char_ids)
+    if user_id is not None:
+        query += " AND user_id = %s"
+        data_set.append(user_id)
+    return query + " FOR UPDATE", data_set
+
+
+# rows: [{char_id, level, exp, coin}] after the awards, one bulk UPDATE
+def award_update_query(rows):
+    cases = " ".join(["WHEN %s THEN %s"] * len(rows))
+    query = (
+        "UPDATE character_list SET"
+        + f" level = CASE char_id {cases} END,"
+        + f" exp = CASE char_id {cases} END,"
+        + f" coin = CASE char_id {cases} END,"
+        + " version = version + 1"
+        + f" WHERE char_id IN ({places(rows)})"
+    )
+    data_set = []
+    for column in ("level", "exp", "coin"):
+        for row in rows:
+            data_set += [row["char_id"], row[column]]
+    data_set += [row["char_id"] for row in rows]
+    return query, data_set  # endregion
+
+
+# region World
+# (entity_type, entity_id)
+WORLD_ENTITY_QUERY = (
+    "SELECT * FROM world WHERE entity_type = %s AND entity_id = %s AND spawn_flag = true"
+)
+# (char_id), the NPCs and the player
+WORLD_DATA_QUERY = (
+    "SELECT * FROM world JOIN npc n ON entity_id = n.npc_id"
+    + " WHERE ((entity_type = 'player' AND entity_id = %s) OR entity_type = 'npc')"
+    + " AND spawn_flag = true"
+)
+# (char_id, x, y)
+PLAYER_ADD_QUERY = "INSERT INTO world (entity_id, x_pos, y_pos) values (%s, %s, %s)"
+SPAWNED_QUERY = "SELECT entity_type, entity_id, x_pos, y_pos FROM world WHERE spawn_flag = true"
+# endregion
+
+
+# region Item & Shop
+def inventory_query(char_id, limit=None, after=None):
+    query = (
+        "SELECT it.item_id, it.type, it.name, it.description, it.img, i.count, i.equip_flag"
+        + " FROM inventory i JOIN item it ON i.item_id = it.item_id"
+        + " WHERE i.char_id = %s"
+    )
+    return keyset_query(query, (char_id,), "i.item_id", limit, after)
+
+
+# counts: {item_id: count}. Pays every item at once, nothing when the
+# character lacks the coin or an item is not on sale (no row changed).
+def buy_query(char_id, user_id, counts):
+    cases = " ".join(["WHEN %s THEN %s"] * len(counts))
+    query = (
+        "UPDATE character_list c JOIN ("
+        + f"SELECT SUM(s.price * CASE s.item_id {cases} END) AS total, COUNT(*) AS n"
+        + f" FROM shop s WHERE s.item_id IN ({places(counts)}) AND s.sale_flag = TRUE"
+        + ") t SET c.coin = c.coin - t.total, c.version = c.version + 1"
+        + " WHERE c.char_id = %s AND c.user_id = %s AND c.deleted_at IS NULL"
+        + " AND t.n = %s AND c.coin >= t.total"
+    )
+    data_set = (
+        [v for pair in counts.items() for v in pair]
+        + list(counts)
+        + [char_id, user_id, len(counts)]
+    )
+    return query, data_set
+
+
+# executemany with (char_id, item_id, count)
+ADD_ITEM_QUERY = (
+    "INSERT INTO inventory (char_id, item_id, count) values (%s, %s, %s)"
+    + " ON DUPLICATE KEY UPDATE count = count + VALUES(count)"
+)
+VERSION_QUERY = "SELECT version FROM character_list WHERE char_id = %s"
+
+EQUIPMENT_JOIN = (
+    " JOIN character_list c ON i.char_id = c.char_id"
+    + " JOIN item it ON i.item_id = it.item_id"
+)
+EQUIPMENT_WHERE = (
+    " WHERE i.char_id = %s AND i.item_id = %s AND c.user_id = %s"
+    + " AND c.deleted_at IS NULL AND it.type IN ('weapon', 'armor')"
+)
+# (equip, char_id, item_id, user_id)
+EQUIP_QUERY = "UPDATE inventory i" + EQUIPMENT_JOIN + " SET i.equip_flag = %s" + EQUIPMENT_WHERE
+# (char_id, item_id, user_id), the equipment exists
+EQUIPMENT_QUERY = "SELECT 1 FROM inventory i" + EQUIPMENT_JOIN + EQUIPMENT_WHERE  # endregion
+
+
+# region Quest
+ACCEPTED_QUEST_IDS_QUERY = "SELECT quest_id FROM accept_quest WHERE char_id = %s"
+# (char_id, quest_id)
+ACCEPT_QUEST_QUERY = "INSERT INTO accept_quest (char_id, quest_id) values (%s, %s)"
+
+
+def accepted_quests_query(char_id, limit=None, after=None):
+    query = (
+        "SELECT * FROM accept_quest aq JOIN quest q ON aq.quest_id = q.quest_id"
+        + " WHERE char_id = %s"
+    )
+    return keyset_query(query, (char_id,), "aq.quest_id", limit, after)
+
+
+# pairs: [(char_id, quest_id)], the open ones of user_id's characters,
+# locked until the caller commits
+def completable_quests_query(pairs, user_id):
+    pair_places = ", ".join(["(%s, %s)"] * len(pairs))
+    query = (
+        "SELECT aq.char_id, aq.quest_id, q.reward_coin, q.reward_exp"
+        + " FROM accept_quest aq"
+        + " JOIN quest q ON aq.quest_id = q.quest_id"
+        + " JOIN character_list c ON aq.char_id = c.char_id"
+        + f" WHERE (aq.char_id, aq.quest_id) IN ({pair_places}) AND aq.completed_at IS NULL"
+        + " AND c.user_id = %s AND c.deleted_at IS NULL"
+        + " FOR UPDATE"
+    )
+    return query, [v for pair in pairs for v in pair] + [user_id]
+
+
+def complete_quests_query(pairs):
+    pair_places = ", ".join(["(%s, %s)"] * len(pairs))
+    query = (
+        "UPDATE accept_quest SET completed_at = NOW()"
+        + f" WHERE (char_id, quest_id) IN ({pair_places})"
+    )
+    return query, [v for pair in pairs for v in pair]  # endregion
@@ -0,0 +1,121 @@
+# EXPLAIN every per request query and fail (exit 1) when one of them
+# scans a whole table no index can serve, or any hot path table at all:
+# those grow with the players, a scan that is cheap on a small DB is not
+# once they did. Run it against a populated DB.
+# The queries are the ones the servers run (queries.py, purge.py,
+# position_buffer.py), with sample arguments. Queries that read whole
+# static tables into the cache are not listed. Plan rows of the INSERT
+# itself show no access type and are not checked.
+# usage: python query_plans.py [--verbose]
+import argparse, re, sys
+import queries
+from migrate import add_db_arguments, connect
+from position_buffer import PositionBuffer
+from purge import DELETED_NICKNAME_QUERY, EXPIRED_QUERY, UNUSED_STATS_QUERY, unused_stats_query
+
+# tables growing with users and characters, never scanned whole
+HOT_TABLES = {"user", "character_list", "stat", "stat_delta", "inventory", "accept_quest", "world"}
+
+# (route, query, sample arguments)
+ROUTE_QUERIES = [
+    ("POST /login", queries.LOGIN_QUERY, ("player", "player")),
+    ("PATCH /login/char/<id>", queries.LAST_ACCESSED_QUERY, (1, "player")),
+    ("GET /user", queries.USER_QUERY, ("player",)),
+    ("GET /users", *queries.users_query(100, "a")),
+    ("GET /characters", *queries.characters_query("player", 100, 0)),
+    ("GET /character/detail/<id>", queries.CHARACTER_DETAIL_QUERY, (1, "player")),
+    ("GET /character/detail/<id>", *queries.stat_rows_query([1, 2])),
+    ("DELETE /character/<id>", queries.DELETE_CHARACTER_QUERY, (1, "player")),
+    ("POST /character/create", DELETED_NICKNAME_QUERY, ("player",)),
+    ("character purge", EXPIRED_QUERY, (604800, 500)),
+    ("character purge", UNUSED_STATS_QUERY, (0, 1000, 500)),
+    ("character purge", *unused_stats_query([1, 2])),
+    ("PATCH /character/update", queries.UPDATE_CHARACTER_QUERY, (1, 0, 0, 100, 1, "player")),
+    ("POST /character/save", queries.SAVE_STATE_QUERY, (1, "player")),
+    ("POST /character/save", *queries.update_save_state_query(1, "player", 0, (1, 0, 0, 100))),
+    *[("POST /character/stats", *q) for q in queries.effective_stats_queries([1, 2])],
+    ("GET /stat/<id>", *queries.stat_query(1)),
+    ("POST /progression/award", *queries.award_select_query([1, 2])),
+    (
+        "POST /progression/award",
+        *queries.award_update_query(
+            [{"char_id": i, "level": 2, "exp": 0, "coin": 10} for i in (1, 2)]
+        ),
+    ),
+    ("world index load", queries.SPAWNED_QUERY, ()),
+    ("position flush", PositionBuffer.query, PositionBuffer.rows({1: (10, 20)})[0]),
+    ("GET /world/<et>/<id>", queries.WORLD_ENTITY_QUERY, ("player", 1)),
+    ("GET /world/all/<id>", queries.WORLD_DATA_QUERY, (1,)),
+    ("GET /inventory/<id>", *queries.inventory_query(1, 100, 0)),
+    ("POST /buy", *queries.buy_query(1, "player", {1: 1, 2: 1})),
+    ("POST /buy", queries.VERSION_QUERY, (1,)),
+    ("POST /buy", queries.ADD_ITEM_QUERY, (1, 2, 1)),
+    ("PATCH /inventory/equip", queries.EQUIP_QUERY, (True, 1, 2, "player")),
+    ("PATCH /inventory/equip", queries.EQUIPMENT_QUERY, (1, 2, "player")),
+    ("GET /quest/<npc_id>", queries.ACCEPTED_QUEST_IDS_QUERY, (1,)),
+    ("POST /quest/accept", queries.ACCEPT_QUEST_QUERY, (1, 1)),
+    ("GET /quest/accept/all/<id>", *queries.accepted_quests_query(1, 100, 0)),
+    ("POST /quest/complete", *queries.completable_quests_query([(1, 1), (2, 2)], "player")),
+    ("POST /quest/complete", *queries.complete_quests_query([(1, 1), (2, 2)])),
+]
+
+# "FROM character_list c", "JOIN stat st", "UPDATE inventory i"
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE)\s+(\w+)", re.IGNORECASE)
+ALIAS = re.compile(r"\s+(?:AS\s+)?(\w+)", re.IGNORECASE)
+NOT_ALIAS = {"where", "on", "set", "join", "left", "right", "inner", "order", "limit", "group", "union"}
+
+
+def table_names(query):
+    # {name in EXPLAIN: table}, an aliased table shows up by its alias
+    names = {}
+    for ref in TABLE_REF.finditer(query):
+        names[ref.group(1)] = ref.group(1)
+        alias = ALIAS.match(query, ref.end())
+        if alias and alias.group(1).lower() not in NOT_ALIAS:
+            names[alias.group(1)] = ref.group(1)
+    return names
+
+
+def check(conn, queries=ROUTE_QUERIES, out=print, verbose=False):
+    # returns the routes with a full scan of a hot table, or of any table
+    # no index can serve
+    failed = []
+    for route, query, data_set in queries:
+        with conn.cursor() as cursor:
+            cursor.execute("EXPLAIN " + query, data_set)
+            plan = cursor.fetchall()
+        tables = table_names(query)
+        bad = [
+            row["table"]
+            for row in plan
+            if row.get("type") == "ALL"
+            and row.get("select_type") != "INSERT"
+            and (tables.get(row["table"]) in HOT_TABLES or not row.get("possible_keys"))
+        ]
+        if bad:
+            failed.append(route)
+            out(f"FAIL {route}: full scan of {', '.join(bad)}")
+        elif verbose:
+            steps = ", ".join(f"{row['table']}:{row['type']}/{row['key']}" for row in plan)
+            out(f"ok   {route}: {steps}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini RPG query plan check")
+    add_db_arguments(parser)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    conn = connect(args)
+    try:
+        failed = check(conn, verbose=args.verbose)
+    finally:
+        conn.rollback()
+        conn.close()
+    print(f"{len(ROUTE_QUERIES) - len(failed)}/{len(ROUTE_QUERIES)} queries ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
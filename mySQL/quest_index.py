@@ -0,0 +1,105 @@
+import random, threading
+
+# alias table draws before falling back to a scan of the remaining quests
+MAX_REJECTS = 8
+
+
+class QuestTable:
+    # Weighted random pick over the quests of one NPC in O(1), using
+    # Walker's alias method. Excluded quests are drawn again, and when most
+    # of them are excluded the remaining ones are scanned instead.
+    def __init__(self, quests, weights):
+        self.quests = quests
+        self._weights = weights
+        n = len(quests)
+        self._total = total = float(sum(weights))
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+        if n == 0 or total <= 0:
+            return
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def pick(self, exclude=(), rng=random):
+        n = len(self.quests)
+        if self._total <= 0:
+            return None
+        for _ in range(MAX_REJECTS):
+            i = rng.randrange(n)
+            if rng.random() >= self._prob[i]:
+                i = self._alias[i]
+            quest = self.quests[i]
+            if quest["quest_id"] not in exclude:
+                return quest
+        left = [
+            (q, w)
+            for q, w in zip(self.quests, self._weights)
+            if q["quest_id"] not in exclude and w > 0
+        ]
+        if not left:
+            return None
+        return rng.choices([q for q, _ in left], [w for _, w in left])[0]
+
+
+def build_quest_tables(rows):
+    # rows: quest rows with npc_id and weight -> {npc_id: QuestTable}
+    by_npc = {}
+    for row in rows:
+        row = dict(row)
+        npc_id = row.pop("npc_id")
+        weight = max(row.pop("weight", 1) or 0, 0)
+        quests, weights = by_npc.setdefault(npc_id, ([], []))
+        quests.append(row)
+        weights.append(weight)
+    return {npc_id: QuestTable(q, w) for npc_id, (q, w) in by_npc.items()}
+
+
+class AcceptedQuests:
+    # quest ids each character has accepted, read from DB once per character
+    # and kept up to date by the accept route
+    def __init__(self, max_chars=10000):
+        self.max_chars = max_chars
+        self._accepted = {}  # char_id -> set of quest_id
+        self._lock = threading.Lock()
+
+    def get(self, char_id, load):
+        # load(char_id) returns the accepted quest ids from DB
+        accepted = self.peek(char_id)
+        if accepted is not None:
+            return accepted
+        return self.put(char_id, load(char_id))
+
+    def peek(self, char_id):
+        return self._accepted.get(char_id)
+
+    def put(self, char_id, quest_ids):
+        with self._lock:
+            if char_id not in self._accepted and len(self._accepted) >= self.max_chars:
+                # drop the character read longest ago
+                self._accepted.pop(next(iter(self._accepted)))
+            return self._accepted.setdefault(char_id, set(quest_ids))
+
+    def add(self, char_id, quest_id):
+        with self._lock:
+            accepted = self._accepted.get(char_id)
+            if accepted is not None:
+                accepted.add(quest_id)
+
+    def invalidate(self, char_id=None):
+        with self._lock:
+            if char_id is None:
+                self._accepted.clear()
+            else:
+                self._accepted.pop(char_id, None)
+
+    def stats(self):
+        return {"characters": len(self._accepted)}
@@ -0,0 +1,44 @@
+import threading
+
+# character_list columns written by the autosave, in this order
+SAVE_FIELDS = ("level", "coin", "exp", "hp")
+
+
+class SaveStateCache:
+    # Last saved (user_id, version, state) of each character, state being the
+    # SAVE_FIELDS values. An autosave equal to it is not written again.
+    # Writers of these columns other than the save route must invalidate.
+    def __init__(self, max_chars=10000):
+        self.max_chars = max_chars
+        self._states = {}  # char_id -> (user_id, version, state)
+        self._lock = threading.Lock()
+        self._skipped = 0
+        self._written = 0
+
+    def get(self, char_id):
+        return self._states.get(char_id)
+
+    def put(self, char_id, user_id, version, state):
+        with self._lock:
+            if char_id not in self._states and len(self._states) >= self.max_chars:
+                # drop the character saved longest ago
+                self._states.pop(next(iter(self._states)))
+            self._states[char_id] = (user_id, version, tuple(state))
+
+    def invalidate(self, char_id):
+        with self._lock:
+            self._states.pop(char_id, None)
+
+    def count(self, written):
+        with self._lock:
+            if written:
+                self._written += 1
+            else:
+                self._skipped += 1
+
+    def stats(self):
+        return {
+            "characters": len(self._states),
+            "written": self._written,
+            "skipped": self._skipped,
+        }
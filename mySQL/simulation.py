@@ -0,0 +1,340 @@
+import math, threading, time
+
+try:
+    import numpy as np
+except ImportError:  # no server side simulation without numpy
+    np = None
+
+PLAYER, NPC, ITEM = 0, 1, 2
+KIND_NAMES = ("player", "npc", "item")
+
+
+class WorldSimulation:
+    # Server side world, stepped tick_rate times a second.
+    # Entity state lives in flat numpy arrays indexed by slot (position,
+    # velocity, kind, id, spawn flag, last update), and each tick works on
+    # whole arrays at once: NPC wandering and movement, item spawns, and
+    # item pickups by players found through a sorted uniform grid.
+    # Players are moved by their clients through set_position().
+    def __init__(
+        self,
+        width=3000,
+        height=3000,
+        tick_rate=20,
+        capacity=1024,
+        max_items=50,
+        spawn_interval=2.0,
+        pickup_radius=50.0,
+        npc_speed=0.0,
+        turn_chance=0.02,
+        player_ttl=60.0,
+        seed=None,
+    ):
+        self.width = width
+        self.height = height
+        self.tick_rate = tick_rate
+        self.max_items = max_items
+        self.spawn_interval = spawn_interval
+        self.pickup_radius = pickup_radius
+        self.npc_speed = npc_speed
+        self.turn_chance = turn_chance
+        self.player_ttl = player_ttl
+        self.on_tick = None  # called with the simulation after every tick
+        self.tick = 0
+
+        self.rng = np.random.default_rng(seed)
+        self.bounds = np.array([width, height], np.float32)
+        self.pos = np.zeros((capacity, 2), np.float32)
+        self.vel = np.zeros((capacity, 2), np.float32)
+        self.kind = np.full(capacity, -1, np.int8)
+        self.ids = np.zeros(capacity, np.int64)
+        self.spawned = np.zeros(capacity, bool)
+        self.seen = np.zeros(capacity, np.float64)
+        self.moved = np.zeros(0, np.int64)  # slots that moved in the last tick
+
+        self._slots = {}  # (kind, id) -> slot, players and npcs
+        self._free = list(range(capacity - 1, -1, -1))
+        self._items = 0
+        self._next_item_id = 1
+        self._spawn_timer = 0.0
+        self._pickups = {}  # char_id -> items picked up and not claimed yet
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._tick_ms = 0.0
+        self._tick_ms_avg = 0.0
+        self._tick_ms_max = 0.0
+        self._overruns = 0
+
+    # region Entities
+    def load(self, rows):
+        # world rows (entity_type, entity_id, x_pos, y_pos)
+        with self._lock:
+            for row in rows:
+                kind = KIND_NAMES.index(row["entity_type"])
+                self._set(kind, row["entity_id"], row["x_pos"], row["y_pos"])
+
+    def set_position(self, kind, entity_id, x, y):
+        with self._lock:
+            self._set(kind, entity_id, x, y)
+
+    def remove(self, kind, entity_id):
+        with self._lock:
+            slot = self._slots.pop((kind, entity_id), None)
+            if slot is not None:
+                self._release(np.array([slot]))
+
+    def spawn_items(self, n):
+        with self._lock:
+            return self._spawn_items(n)
+
+    def items_near(self, x, y, radius):
+        # [(item_id, x, y)] within radius
+        with self._lock:
+            items = np.flatnonzero(self.spawned & (self.kind == ITEM))
+            d = self.pos[items] - np.array([x, y], np.float32)
+            near = items[(d * d).sum(axis=1) <= radius * radius]
+            return [
+                (int(i), float(p[0]), float(p[1]))
+                for i, p in zip(self.ids[near], self.pos[near])
+            ]
+
+    def claim_pickups(self, char_id):
+        with self._lock:
+            return self._pickups.pop(char_id, 0)
+
+    def give_back(self, char_id, count):
+        with self._lock:
+            self._pickups[char_id] = self._pickups.get(char_id, 0) + count
+
+    def keys(self, slots):
+        return [(KIND_NAMES[k], int(i)) for k, i in zip(self.kind[slots], self.ids[slots])]
+
+    # endregion
+
+    # region Tick
+    def step(self, dt=None):
+        # returns {char_id: items picked up in this tick}
+        dt = 1.0 / self.tick_rate if dt is None else dt
+        with self._lock:
+            self.tick += 1
+            self._expire_players()
+            self._wander()
+            self._move(dt)
+            self._spawn(dt)
+            return self._pickup()
+
+    def _expire_players(self):
+        if self.player_ttl is None:
+            return
+        stale = np.flatnonzero(
+            self.spawned
+            & (self.kind == PLAYER)
+            & (self.seen < time.monotonic() - self.player_ttl)
+        )
+        if stale.size:
+            for key in zip(self.kind[stale].tolist(), self.ids[stale].tolist()):
+                self._slots.pop(key, None)
+            self._release(stale)
+
+    def _wander(self):
+        # some NPCs turn to a random direction every tick
+        if self.npc_speed <= 0:
+            return
+        npcs = np.flatnonzero(self.spawned & (self.kind == NPC))
+        turn = npcs[self.rng.random(npcs.size) < self.turn_chance]
+        angle = self.rng.uniform(0.0, 2 * math.pi, turn.size)
+        self.vel[turn, 0] = np.cos(angle) * self.npc_speed
+        self.vel[turn, 1] = np.sin(angle) * self.npc_speed
+
+    def _move(self, dt):
+        moving = np.flatnonzero(self.spawned & self.vel.any(axis=1))
+        if moving.size:
+            pos = self.pos[moving] + self.vel[moving] * dt
+            vel = self.vel[moving]
+            # bounce off the map edges
+            out = (pos < 0) | (pos > self.bounds)
+            vel[out] *= -1
+            self.pos[moving] = np.clip(pos, 0, self.bounds)
+            self.vel[moving] = vel
+        self.moved = moving
+
+    def _spawn(self, dt):
+        self._spawn_timer += dt
+        if self._spawn_timer < self.spawn_interval:
+            return
+        n = int(self._spawn_timer // self.spawn_interval)
+        self._spawn_timer -= n * self.spawn_interval
+        self._spawn_items(n)
+
+    def _spawn_items(self, n):
+        n = min(n, self.max_items - self._items)
+        if n <= 0:
+            return 0
+        slots = self._take(n)
+        self.pos[slots] = self.rng.random((n, 2), np.float32) * self.bounds
+        self.vel[slots] = 0
+        self.kind[slots] = ITEM
+        self.ids[slots] = np.arange(self._next_item_id, self._next_item_id + n)
+        self.spawned[slots] = True
+        self._next_item_id += n
+        self._items += n
+        return n
+
+    def _pickup(self):
+        items = np.flatnonzero(self.spawned & (self.kind == ITEM))
+        players = np.flatnonzero(self.spawned & (self.kind == PLAYER))
+        if items.size == 0 or players.size == 0:
+            return {}
+        player_idx, item_idx = self._pairs(self.pos[players], self.pos[items])
+        if player_idx.size == 0:
+            return {}
+        d = self.pos[players[player_idx]] - self.pos[items[item_idx]]
+        hit = (d * d).sum(axis=1) < self.pickup_radius * self.pickup_radius
+        player_idx, item_idx = player_idx[hit], item_idx[hit]
+        if item_idx.size == 0:
+            return {}
+        # an item reached by two players at once goes to one of them
+        item_idx, first = np.unique(item_idx, return_index=True)
+        player_idx = player_idx[first]
+        self._release(items[item_idx])
+        self._items -= item_idx.size
+
+        counts = np.bincount(player_idx, minlength=players.size)
+        picked = {}
+        for j in np.flatnonzero(counts):
+            char_id = int(self.ids[players[j]])
+            picked[char_id] = int(counts[j])
+            self._pickups[char_id] = self._pickups.get(char_id, 0) + picked[char_id]
+        return picked
+
+    def _pairs(self, a, b):
+        # index pairs (i, j) of a and b in the same or neighbouring grid
+        # cells of pickup_radius size, the candidates for a pickup
+        cell = self.pickup_radius
+        rows = int(max(self.width, self.height) // cell) + 3
+        b_cells = (b // cell).astype(np.int64) + 1
+        b_keys = b_cells[:, 0] * rows + b_cells[:, 1]
+        order = np.argsort(b_keys, kind="stable")
+        sorted_keys = b_keys[order]
+        a_cells = (a // cell).astype(np.int64) + 1
+        pairs_a, pairs_b = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = (a_cells[:, 0] + dx) * rows + (a_cells[:, 1] + dy)
+                lo = np.searchsorted(sorted_keys, keys, "left")
+                hi = np.searchsorted(sorted_keys, keys, "right")
+                counts = hi - lo
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+                pairs_a.append(np.repeat(np.arange(a.shape[0]), counts))
+                pairs_b.append(order[starts + np.arange(total)])
+        if not pairs_a:
+            empty = np.zeros(0, np.int64)
+            return empty, empty
+        return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+    # endregion
+
+    # region Slots
+    def _set(self, kind, entity_id, x, y):
+        key = (kind, entity_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = int(self._take(1)[0])
+            self._slots[key] = slot
+            self.kind[slot] = kind
+            self.ids[slot] = entity_id
+            self.vel[slot] = 0
+            self.spawned[slot] = True
+        self.pos[slot] = np.clip((x, y), 0, self.bounds)
+        self.seen[slot] = time.monotonic()
+        return slot
+
+    def _take(self, n):
+        while len(self._free) < n:
+            self._grow()
+        slots = self._free[-n:]
+        del self._free[-n:]
+        return np.array(slots, np.int64)
+
+    def _release(self, slots):
+        self.spawned[slots] = False
+        self.kind[slots] = -1
+        self.vel[slots] = 0
+        self._free.extend(slots.tolist())
+
+    def _grow(self):
+        old = self.pos.shape[0]
+        new = old * 2
+        self.pos = np.concatenate([self.pos, np.zeros((old, 2), np.float32)])
+        self.vel = np.concatenate([self.vel, np.zeros((old, 2), np.float32)])
+        self.kind = np.concatenate([self.kind, np.full(old, -1, np.int8)])
+        self.ids = np.concatenate([self.ids, np.zeros(old, np.int64)])
+        self.spawned = np.concatenate([self.spawned, np.zeros(old, bool)])
+        self.seen = np.concatenate([self.seen, np.zeros(old, np.float64)])
+        self._free[:0] = range(new - 1, old - 1, -1)
+
+    # endregion
+
+    # region Loop
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="world-sim", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            kinds = np.bincount(self.kind[self.spawned], minlength=3)
+            return {
+                "tick": self.tick,
+                "tick_rate": self.tick_rate,
+                "players": int(kinds[PLAYER]),
+                "npcs": int(kinds[NPC]),
+                "items": int(kinds[ITEM]),
+                "capacity": self.pos.shape[0],
+                "unclaimed_pickups": sum(self._pickups.values()),
+                "tick_ms": round(self._tick_ms, 3),
+                "tick_ms_avg": round(self._tick_ms_avg, 3),
+                "tick_ms_max": round(self._tick_ms_max, 3),
+                "overruns": self._overruns,
+            }
+
+    def _run(self):
+        interval = 1.0 / self.tick_rate
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            start = time.perf_counter()
+            with self._lock:
+                self.step(interval)
+                if self.on_tick is not None:
+                    # sees the arrays of this tick
+                    self.on_tick(self)
+            self._timed((time.perf_counter() - start) * 1000, interval * 1000)
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._stopped.wait(delay)
+            else:
+                # fell behind, do not try to catch up with a burst of ticks
+                next_tick = time.monotonic()
+
+    def _timed(self, ms, budget_ms):
+        self._tick_ms = ms
+        self._tick_ms_avg = ms if self.tick <= 1 else self._tick_ms_avg * 0.95 + ms * 0.05
+        self._tick_ms_max = max(self._tick_ms_max, ms)
+        if ms > budget_ms:
+            self._overruns += 1
+
+    # endregion
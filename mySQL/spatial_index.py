@@ -0,0 +1,81 @@
+import threading
+
+
+class GridIndex:
+    # Uniform grid over world positions.
+    # Entities are keyed by (entity_type, entity_id) and stored in the cell
+    # that contains their position, so a range query only visits the cells
+    # overlapping the search square instead of every entity.
+    def __init__(self, cell_size=256):
+        self.cell_size = cell_size
+        self._cells = {}  # (cx, cy) -> set of keys
+        self._positions = {}  # key -> (x, y)
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def load(self, rows):
+        with self._lock:
+            self._cells.clear()
+            self._positions.clear()
+            for row in rows:
+                self.upsert(
+                    (row["entity_type"], row["entity_id"]), row["x_pos"], row["y_pos"]
+                )
+            self.loaded = True
+
+    def upsert(self, key, x, y):
+        x, y = float(x), float(y)
+        cell = self._cell(x, y)
+        with self._lock:
+            old = self._positions.get(key)
+            if old is not None:
+                old_cell = self._cell(*old)
+                if old_cell != cell:
+                    self._discard(old_cell, key)
+            self._positions[key] = (x, y)
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            old = self._positions.pop(key, None)
+            if old is not None:
+                self._discard(self._cell(*old), key)
+
+    def position(self, key):
+        with self._lock:
+            return self._positions.get(key)
+
+    def query(self, x, y, radius):
+        # [(key, (x, y)), ...] within radius of (x, y), nearest first
+        x, y = float(x), float(y)
+        r2 = radius * radius
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        found = []
+        with self._lock:
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    for key in self._cells.get((cx, cy), ()):
+                        px, py = self._positions[key]
+                        d2 = (px - x) ** 2 + (py - y) ** 2
+                        if d2 <= r2:
+                            found.append((d2, key, (px, py)))
+        found.sort(key=lambda f: f[0])
+        return [(key, pos) for _, key, pos in found]
+
+    def items(self):
+        with self._lock:
+            return list(self._positions.items())
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def _discard(self, cell, key):
+        keys = self._cells.get(cell)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._cells[cell]
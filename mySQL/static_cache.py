@@ -0,0 +1,156 @@
+import hashlib, json, threading, time
+from quest_index import build_quest_tables
+from progression import build_curves
+
+
+class StaticCache:
+    # In-process copy of the tables that only change with game updates:
+    # character_class, class_stat, stat (templates), skill, max_exp (with
+    # the dense level curves built from it), shop/item, npc and quest.
+    # The whole snapshot is rebuilt at once and swapped in, so readers never
+    # see a half loaded cache. It is reloaded when ttl seconds have passed
+    # (None: never) or after invalidate().
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self.version = 0
+        self._data = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, connect):
+        # connect is only called when the snapshot has to be (re)loaded
+        data = self.fresh()
+        if data is not None:
+            return data
+        with self._lock:
+            if self._data is None or self._expired():
+                self._load(connect())
+            return self._data
+
+    def reload(self, conn):
+        with self._lock:
+            self._load(conn)
+            return self.version
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+        self._data = None
+
+    def info(self):
+        data = self._data
+        return {
+            "version": self.version,
+            "digest": data["digest"] if data else None,
+            "loaded": data is not None,
+            "age": round(time.monotonic() - self._loaded_at, 3) if data else None,
+            "ttl": self.ttl,
+        }
+
+    def fresh(self):
+        # the snapshot if it can be used as is, else None
+        data = self._data
+        if data is not None and not self._expired():
+            return data
+        return None
+
+    def store(self, results):
+        # results: {name: rows} of STATIC_QUERIES. Hashed before
+        # build_snapshot(), which moves class_id/level out of the rows.
+        content = digest(results)
+        data = build_snapshot(results)
+        self.version += 1
+        data["version"] = self.version
+        data["digest"] = content
+        self._data = data
+        self._loaded_at = time.monotonic()
+        return data
+
+    def _expired(self):
+        return self.ttl is not None and time.monotonic() - self._loaded_at >= self.ttl
+
+    def _load(self, conn):
+        results = {}
+        with conn.cursor() as cursor:
+            for name, query in STATIC_QUERIES:
+                cursor.execute(query)
+                results[name] = cursor.fetchall()
+        self.store(results)
+
+
+STATIC_QUERIES = [
+    ("classes", "SELECT * FROM character_class ORDER BY class_id"),
+    (
+        "class_stats",
+        "SELECT cs.class_id, cs.level, st.* FROM class_stat cs"
+        + " JOIN stat st ON cs.stat_id = st.stat_id"
+        + " ORDER BY cs.class_id, cs.level",
+    ),
+    (
+        "skills",
+        "SELECT s.class_id, s.level, s.name, s.description, s.img, s.cooltime,"
+        + " s.target, s.target_count, s.type, st.*"
+        + " FROM skill s JOIN stat st ON s.stat_id = st.stat_id"
+        + " ORDER BY s.skill_id",
+    ),
+    ("max_exp", "SELECT class_id, level, exp FROM max_exp ORDER BY class_id, level"),
+    (
+        "shop",
+        "SELECT i.item_id, i.type, i.name, i.description, i.img, s.price"
+        + " FROM shop s JOIN item i ON s.item_id = i.item_id"
+        + " ORDER BY s.item_id",
+    ),
+    ("npcs", "SELECT * FROM npc ORDER BY npc_id"),
+    (
+        "quests",
+        "SELECT quest_id, npc_id, npc_talk, need_count, reward_coin, reward_exp, weight"
+        + " FROM quest ORDER BY quest_id",
+    ),
+]
+
+
+def digest(results):
+    # content hash of the static tables, the same as long as the data is,
+    # across reloads and server restarts
+    text = json.dumps(results, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def build_snapshot(results):
+    classes = results["classes"]
+    data = {
+        "classes": {c["class_id"]: c for c in classes},
+        "class_tree": build_class_tree(classes),
+        "class_stats": {},
+        "stat_templates": {},
+        "skills": {},
+        "max_exp": {},
+        "shop": results["shop"],
+        "npcs": {n["npc_id"]: n for n in results["npcs"]},
+        "quests": build_quest_tables(results["quests"]),
+    }
+    for row in results["class_stats"]:
+        key = (row.pop("class_id"), row.pop("level"))
+        data["class_stats"][key] = row
+        data["stat_templates"][row["stat_id"]] = row
+    for row in results["skills"]:
+        data["skills"].setdefault(row.pop("class_id"), []).append(row)
+    for row in results["max_exp"]:
+        data["max_exp"].setdefault(row.pop("class_id"), []).append(row)
+    data["curves"] = build_curves(data["classes"], data["max_exp"])
+    return data
+
+
+def build_class_tree(classes):
+    # Same shape as /class/all: open parent classes with their open children.
+    # if parent class is locked, all children will be locked too.
+    tree = {}
+    for c in classes:
+        if c.get("include_class") is None and c.get("open_flag"):
+            tree[c["class_id"]] = {"name": c["name"], "color": c["color"], "child": []}
+    for c in classes:
+        parent = c.get("include_class")
+        if parent is not None and c.get("open_flag") and parent in tree:
+            tree[parent]["child"].append(
+                {"id": c["class_id"], "name": c["name"], "color": c["color"]}
+            )
+    return tree
@@ -0,0 +1,254 @@
+import asyncio, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, query, data_set=None):
+        self.conn.queries.append((query, data_set))
+        self.rows = list(self.conn.respond(query, data_set) or [])
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def executemany(self, query, data_sets):
+        for data_set in data_sets:
+            self.execute(query, data_set)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    # records queries, rows come from respond(query, data_set)
+    def __init__(self, respond):
+        self.respond = respond
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda query, data_set: [])
+        self.acquired = []
+        self.released = []  # (conn, discard)
+
+    def acquire(self):
+        conn = FakeConnection(lambda query, data_set: self.respond(query, data_set))
+        self.acquired.append(conn)
+        return conn
+
+    def release(self, conn, discard=False):
+        self.released.append((conn, discard))
+
+    @property
+    def in_use(self):
+        released = [conn for conn, _ in self.released]
+        return [conn for conn in self.acquired if conn not in released]
+
+    def queries(self):
+        return [q for conn in self.acquired for q, _ in conn.queries]
+
+    def stats(self):
+        return {"in_use": len(self.in_use)}
+
+
+class AsyncFakeCursor:
+    # aiomysql cursor API over a FakeCursor
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    async def execute(self, query, data_set=None):
+        return self.cursor.execute(query, data_set)
+
+    async def executemany(self, query, data_sets):
+        self.cursor.executemany(query, data_sets)
+
+    async def fetchone(self):
+        return self.cursor.fetchone()
+
+    async def fetchall(self):
+        return self.cursor.fetchall()
+
+    async def close(self):
+        pass
+
+    async def __aiter__(self):
+        for row in self.cursor:
+            yield row
+
+    async def _self(self):
+        return self
+
+    def __await__(self):
+        return self._self().__await__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class AsyncFakeConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+
+    def cursor(self, cursorclass=None):
+        return AsyncFakeCursor(self.conn.cursor())
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        self.conn.commit()
+
+    async def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncFakePool:
+    # aiomysql pool API over a FakePool: acquire() is awaited or used with
+    # async with, a connection closed before release() is discarded
+    def __init__(self, pool):
+        self.pool = pool
+
+    def acquire(self):
+        return AsyncAcquire(self)
+
+    def release(self, conn):
+        self.pool.release(conn.conn, discard=conn.closed)
+
+    # pool_stats() gauges, every connection is in use
+    @property
+    def size(self):
+        return len(self.pool.in_use)
+
+    freesize = 0
+    minsize = 0
+    maxsize = 100
+
+
+class AsyncAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    async def _acquire(self):
+        return AsyncFakeConnection(self.pool.pool.acquire())
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self):
+        self.conn = await self._acquire()
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        self.pool.release(self.conn)
+
+
+@pytest.fixture
+def app_module():
+    import app
+
+    return app
+
+
+@pytest.fixture
+def pool(app_module, monkeypatch):
+    # every request of the sync server gets its connections from here
+    pool = FakePool()
+    monkeypatch.setattr(app_module.db_router, "primary", pool)
+    return pool
+
+
+@pytest.fixture
+def client(app_module, pool):
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+def login(client, user_id="tester"):
+    with client.session_transaction() as sess:
+        sess["login"] = user_id
+
+
+@pytest.fixture
+def async_module():
+    import async_app
+
+    return async_app
+
+
+@pytest.fixture
+def async_pool(async_module, monkeypatch):
+    # every request of the async server gets its connections from here
+    pool = FakePool()
+    monkeypatch.setattr(async_module, "db_pool", AsyncFakePool(pool))
+    return pool
+
+
+@pytest.fixture
+def async_client(async_module, async_pool):
+    async_module.app.config["TESTING"] = True
+    return async_module.app.test_client()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def async_login(client, user_id="tester"):
+    async with client.session_transaction() as sess:
+        sess["login"] = user_id
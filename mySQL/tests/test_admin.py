@@ -0,0 +1,47 @@
+from progression import AWARD_MAX
+from conftest import login
+
+
+def test_cache_reload_needs_login(client, pool):
+    assert client.post("/cache/reload").status_code == 401
+    assert pool.acquired == []
+
+
+def test_cache_reload_needs_admin(client, pool, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_USERS", {"admin"})
+    login(client, "player")
+    assert client.post("/cache/reload").status_code == 403
+    login(client, "admin")
+    assert client.post("/cache/reload").status_code == 200
+
+
+def test_award_needs_admin(client, pool, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_USERS", {"admin"})
+    login(client, "player")
+    response = client.post("/progression/award", json={"awards": [{"char_id": 1, "exp": 10}]})
+    assert response.status_code == 403
+    assert pool.acquired == []
+
+
+def test_award_rejects_invalid_amounts(client, pool, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_USERS", {"admin"})
+    login(client, "admin")
+    for award in (
+        {"char_id": 1, "exp": True},
+        {"char_id": True, "exp": 1},
+        {"char_id": 1, "coin": -5},
+        {"char_id": 1, "exp": AWARD_MAX + 1},
+        {"char_id": 1, "exp": 1.5},
+    ):
+        response = client.post("/progression/award", json={"awards": [award]})
+        assert response.status_code == 400, award
+    assert pool.acquired == []
+
+
+def test_world_flush_needs_admin(client, pool, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_USERS", {"admin"})
+    assert client.post("/world/flush").status_code == 401
+    login(client, "player")
+    assert client.post("/world/flush").status_code == 403
+    login(client, "admin")
+    assert client.post("/world/flush").status_code == 200
@@ -0,0 +1,214 @@
+from conftest import async_login, run
+
+SAVE = {"char_id": 1, "version": 3, "level": 2, "coin": 50, "exp": 10, "hp": 100}
+
+
+def save_rows(query, data_set):
+    if query.startswith("SELECT version"):
+        return [{"version": 3, "level": 1, "coin": 0, "exp": 0, "hp": 100}]
+    if query.startswith("UPDATE character_list"):
+        return [{}]
+    return []
+
+
+def test_save_writes_only_changes(async_client, async_pool, async_module):
+    async_pool.respond = save_rows
+
+    async def play():
+        await async_login(async_client)
+        first = await async_client.post("/character/save", json=SAVE)
+        second = await async_client.post("/character/save", json=dict(SAVE, version=4))
+        return await first.get_json(), await second.get_json()
+
+    first, second = run(play())
+    async_module.save_states.invalidate(1)
+    assert (first["version"], first["written"]) == (4, True)
+    assert (second["version"], second["written"]) == (4, False)
+    updates = [q for q in async_pool.queries() if q.startswith("UPDATE")]
+    assert len(updates) == 1
+    assert async_pool.in_use == []
+
+
+def test_save_of_old_version_conflicts(async_client, async_pool, async_module):
+    async_pool.respond = save_rows
+
+    async def play():
+        await async_login(async_client)
+        response = await async_client.post("/character/save", json=dict(SAVE, version=2))
+        return response.status_code, await response.get_json()
+
+    status, body = run(play())
+    async_module.save_states.invalidate(1)
+    assert status == 409
+    assert body["data"] == {"version": 3, "level": 1, "coin": 0, "exp": 0, "hp": 100}
+
+
+def test_save_moves_player(async_client, async_pool, async_module):
+    async_pool.respond = save_rows
+
+    async def play():
+        await async_login(async_client)
+        await async_client.post("/character/save", json=dict(SAVE, x=10, y=20))
+
+    run(play())
+    async_module.save_states.invalidate(1)
+    assert async_module.position_buffer.get(1) == (10, 20)
+    assert async_module.world_index.position(("player", 1)) == (10.0, 20.0)
+    async_module.position_buffer.flushed(async_module.position_buffer.take())
+    async_module.world_index.remove(("player", 1))
+
+
+def routes(app):
+    return {
+        (rule.rule, method)
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint != "static"
+        for method in rule.methods - {"HEAD", "OPTIONS"}
+    }
+
+
+def test_same_routes_as_sync(app_module, async_module):
+    assert routes(async_module.app) == routes(app_module.app)
+
+
+def user_rows(query, data_set):
+    if query.startswith("SELECT user_id FROM user"):
+        return [{"user_id": "a"}, {"user_id": "b"}]
+    return []
+
+
+def test_users_paged(async_client, async_pool):
+    async_pool.respond = user_rows
+
+    async def play():
+        await async_login(async_client)
+        response = await async_client.get("/users?limit=2")
+        return response.headers.get("X-Next-After"), await response.get_json()
+
+    after, body = run(play())
+    assert after == "b"
+    assert body == {"data": ["a", "b"]}
+    assert async_pool.queries()[0].endswith("ORDER BY user_id LIMIT %s")
+
+
+def test_stream_reads_all_rows(async_client, async_pool):
+    async_pool.respond = user_rows
+
+    async def play():
+        await async_login(async_client)
+        response = await async_client.get("/users?stream=1")
+        return await response.get_json()
+
+    assert run(play()) == {"data": ["a", "b"]}
+    assert async_pool.in_use == []
+    assert [discard for _, discard in async_pool.released] == [False]
+
+
+def test_static_route_not_modified(async_client, async_pool, async_module):
+    async_module.static_cache.invalidate()
+
+    async def play():
+        await async_login(async_client)
+        first = await async_client.get("/shop")
+        etag = first.headers["ETag"]
+        second = await async_client.get("/shop", headers={"If-None-Match": etag})
+        return first.status_code, second.status_code, second.headers.get("ETag") == etag
+
+    assert run(play()) == (200, 304, True)
+
+
+def test_reads_go_to_replica(async_client, async_pool, async_module, monkeypatch):
+    from conftest import AsyncFakePool, FakePool
+    from db_router import ReplicaRouter
+
+    replica = FakePool(user_rows)
+    router = ReplicaRouter(async_module.db_pool, [AsyncFakePool(replica)])
+    monkeypatch.setattr(async_module, "db_router", router)
+    async_module.static_cache.invalidate()
+
+    async def play():
+        await async_login(async_client)
+        await async_client.get("/users")
+        await async_client.get("/shop")
+        await async_client.post("/quest/accept", json={"char_id": 1, "quest_id": 2})
+        # the session wrote, its reads stay on the primary for a while
+        await async_client.get("/users")
+
+    run(play())
+    async_module.accepted_quests.invalidate(1)
+    assert len([q for q in replica.queries() if "FROM user" in q]) == 1
+    assert len([q for q in async_pool.queries() if "FROM user" in q]) == 1
+    # the static cache is filled from the primary
+    assert not any("character_class" in q for q in replica.queries())
+    assert replica.in_use == [] and async_pool.in_use == []
+
+
+def test_world_flush_needs_admin(async_client, async_pool, async_module, monkeypatch):
+    monkeypatch.setattr(async_module, "ADMIN_USERS", {"admin"})
+
+    async def play():
+        codes = [(await async_client.post("/world/flush")).status_code]
+        for user_id in ("player", "admin"):
+            await async_login(async_client, user_id)
+            codes.append((await async_client.post("/world/flush")).status_code)
+        return codes
+
+    assert run(play()) == [401, 403, 200]
+
+
+def test_batch_shares_session_and_rolls_back(async_client, async_pool):
+    async_pool.respond = user_rows
+
+    async def play():
+        await async_login(async_client)
+        shared = await async_client.post(
+            "/batch", json={"requests": [{"path": "/users"}, {"path": "/users"}]}
+        )
+        failed = await async_client.post(
+            "/batch",
+            json={
+                "transaction": True,
+                "requests": [{"path": "/users"}, {"path": "/nowhere"}, {"path": "/users"}],
+            },
+        )
+        return await shared.get_json(), await failed.get_json()
+
+    shared, failed = run(play())
+    assert [r["status"] for r in shared["data"]] == [200, 200]
+    assert shared["data"][0]["body"] == {"data": ["a", "b"]}
+    assert [r["status"] for r in failed["data"]] == [200, 404, 424]
+    assert failed["committed"] is False
+    batch_conn = async_pool.acquired[-1]
+    assert (batch_conn.commits, batch_conn.rollbacks) == (0, 1)
+    assert len(batch_conn.queries) == 1
+    assert async_pool.in_use == []
+
+
+def test_batch_transaction_rejects_buffered_position(async_client, async_pool, async_module):
+    position = {"method": "PATCH", "path": "/world/update", "body": {"id": 1, "x": 5, "y": 5}}
+
+    async def play():
+        await async_login(async_client)
+        response = await async_client.post(
+            "/batch", json={"transaction": True, "requests": [position]}
+        )
+        return await response.get_json()
+
+    assert run(play())["data"][0]["status"] == 400
+    assert async_module.position_buffer.get(1) is None
+
+
+def test_metrics_count_requests(async_client, async_pool, async_module):
+    async_pool.respond = user_rows
+
+    async def play():
+        await async_login(async_client)
+        await async_client.post("/batch", json={"requests": [{"path": "/users"}]})
+        response = await async_client.get("/metrics")
+        return response.status_code, await response.get_data(as_text=True)
+
+    status, text = run(play())
+    assert status == 200
+    assert 'minirpg_http_requests_total{route="/users",method="GET",status="200"}' in text
+    assert "minirpg_db_pool_in_use" in text
+    assert async_module.metrics._requests[("/batch", "POST", 200)] >= 1
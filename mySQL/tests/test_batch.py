@@ -0,0 +1,122 @@
+from conftest import login
+
+
+def user_rows(query, data_set):
+    if query.startswith("SELECT user_id FROM user"):
+        return [{"user_id": "a"}]
+    return []
+
+
+def test_batch_shares_session_and_connection(client, pool):
+    pool.respond = user_rows
+    login(client)
+    response = client.post(
+        "/batch",
+        json={"requests": [{"path": "/users"}, {"method": "GET", "path": "/users"}]},
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [r["status"] for r in body["data"]] == [200, 200]
+    assert body["data"][0]["body"] == {"data": ["a"]}
+    assert len(pool.acquired) == 1
+    assert pool.in_use == []
+
+
+def test_batch_without_login(client, pool):
+    response = client.post("/batch", json={"requests": [{"path": "/users"}]})
+    assert response.get_json()["data"][0]["status"] == 401
+
+
+def test_batch_denied_route(client, pool):
+    login(client)
+    response = client.post("/batch", json={"requests": [{"method": "POST", "path": "/batch"}]})
+    assert response.get_json()["data"][0]["status"] == 400
+
+
+def test_batch_transaction_rolls_back_on_failure(client, pool):
+    login(client)
+    response = client.post(
+        "/batch",
+        json={
+            "transaction": True,
+            "requests": [{"path": "/users"}, {"path": "/nowhere"}, {"path": "/users"}],
+        },
+    )
+    body = response.get_json()
+    assert [r["status"] for r in body["data"]] == [200, 404, 424]
+    assert body["committed"] is False
+    assert pool.acquired[0].commits == 0
+
+
+def test_accepted_quest_cached_after_commit(client, pool, app_module):
+    app_module.accepted_quests.put(1, [5])
+    login(client)
+    response = client.post("/quest/accept", json={"char_id": 1, "quest_id": 7})
+    assert response.status_code == 201
+    assert app_module.accepted_quests.peek(1) == {5, 7}
+    app_module.accepted_quests.invalidate(1)
+
+
+def test_rolled_back_quest_is_not_cached(client, pool, app_module):
+    app_module.accepted_quests.put(1, [5])
+    login(client)
+    response = client.post(
+        "/batch",
+        json={
+            "transaction": True,
+            "requests": [
+                {"method": "POST", "path": "/quest/accept", "body": {"char_id": 1, "quest_id": 7}},
+                {"path": "/nowhere"},
+            ],
+        },
+    )
+    assert response.get_json()["committed"] is False
+    assert app_module.accepted_quests.peek(1) is None
+
+
+def test_invalidated_again_after_batch(app_module):
+    cache = app_module.stats_cache
+    conn = app_module.DeferredCommit(object())
+    cache.put(1, 0, {"atk": 1})
+    app_module.invalidate_after_commit(conn, lambda: cache.invalidate(1))
+    assert cache.get(1, 0) is None
+    # read by another request before the batch committed
+    cache.put(1, 0, {"atk": 1})
+    conn.finish()
+    assert cache.get(1, 0) is None
+
+
+def test_equip_in_batch_invalidates_after_rollback(client, pool, app_module):
+    pool.respond = lambda query, data_set: [{}] if query.startswith("UPDATE inventory") else []
+    app_module.stats_cache.put(1, 0, {"atk": 1})
+    login(client)
+    response = client.post(
+        "/batch",
+        json={
+            "transaction": True,
+            "requests": [
+                {"method": "PATCH", "path": "/inventory/equip", "body": {"char_id": 1, "item_id": 2}},
+                {"path": "/nowhere"},
+            ],
+        },
+    )
+    assert [r["status"] for r in response.get_json()["data"]] == [200, 404]
+    assert app_module.stats_cache.get(1, 0) is None
+
+
+def test_batch_requests_are_measured(client, pool, app_module):
+    pool.respond = user_rows
+    login(client)
+    client.post("/batch", json={"requests": [{"path": "/users"}, {"path": "/nowhere"}]})
+    requests = app_module.metrics._requests
+    assert requests[("/users", "GET", 200)] >= 1
+    assert requests[("unmatched", "GET", 404)] >= 1
+    assert requests[("/batch", "POST", 200)] >= 1
+
+
+def test_transaction_rejects_buffered_position(client, pool, app_module):
+    login(client)
+    position = {"method": "PATCH", "path": "/world/update", "body": {"id": 1, "x": 5, "y": 5}}
+    response = client.post("/batch", json={"transaction": True, "requests": [position]})
+    assert response.get_json()["data"][0]["status"] == 400
+    assert app_module.position_buffer.get(1) is None
@@ -0,0 +1,65 @@
+import pymysql
+import pytest
+
+from conftest import FakePool, login
+from db_router import ReplicaRouter, reporting_class
+
+
+class Connection:
+    def __init__(self, error=None):
+        self.error = error
+
+    def query(self, sql, unbuffered=False):
+        if self.error is not None:
+            raise self.error
+        return 1
+
+
+def test_lost_connection_reported():
+    lost = []
+    Reporting = reporting_class(Connection, lambda e: isinstance(e, OSError), lambda: lost.append(1))
+    assert Reporting().query("SELECT 1") == 1
+    with pytest.raises(ValueError):
+        Reporting(ValueError("bad query")).query("SELECT 1")
+    assert lost == []
+    with pytest.raises(OSError):
+        Reporting(OSError("gone")).query("SELECT 1")
+    assert lost == [1]
+
+
+def test_connection_lost_errors(app_module):
+    assert app_module.connection_lost(pymysql.err.OperationalError(2013, "Lost connection"))
+    assert app_module.connection_lost(pymysql.err.InterfaceError(0, ""))
+    # lock wait timeout, the replica is fine
+    assert not app_module.connection_lost(pymysql.err.OperationalError(1205, "Lock wait"))
+
+
+def test_failed_replica_left_out():
+    primary, replica = FakePool(), FakePool()
+    router = ReplicaRouter(primary, [replica], retry_after=60)
+    assert router.acquire_read()[0] is replica
+    router.failed(replica)
+    assert router.acquire_read()[0] is primary
+
+
+def test_shared_caches_filled_from_primary(app_module, client, pool, monkeypatch):
+    replica = FakePool()
+    monkeypatch.setattr(app_module, "db_router", ReplicaRouter(pool, [replica]))
+    app_module.static_cache.invalidate()
+    app_module.accepted_quests.invalidate(5)
+    login(client)
+    client.get("/quest/1?char_id=5")
+    assert any("accept_quest" in q for q in pool.queries())
+    assert not any("accept_quest" in q for q in replica.queries())
+    assert not any("character_class" in q for q in replica.queries())
+    assert pool.in_use == [] and replica.in_use == []
+
+
+def test_primary_read_checks_out_no_replica(app_module, client, pool, monkeypatch):
+    replica = FakePool()
+    monkeypatch.setattr(app_module, "db_router", ReplicaRouter(pool, [replica]))
+    app_module.accepted_quests.invalidate(5)
+    login(client)
+    client.get("/quest/1?char_id=5")
+    assert replica.acquired == []
+    assert len(pool.acquired) == 1
@@ -0,0 +1,18 @@
+from effective_stats import compute
+
+SKILLS = [
+    {"type": "buff", "level": 15, "atk": 5},
+    {"type": "buff", "level": 21, "atk": 100},
+    {"type": "attack", "level": 1, "atk": 7},
+]
+
+
+def test_buffs_follow_client_skill_rule():
+    # level 10: the level 15 buff is active, level 21 is not (10 + 10 < 21)
+    stats = compute({"atk": 10}, [{"type": "weapon", "effect_value": 3}], SKILLS, 10)
+    assert stats["buffs"]["atk"] == 5
+    assert stats["items"]["atk"] == 3
+    assert stats["total"]["atk"] == 18
+    assert compute({"atk": 10}, [], SKILLS, 4)["buffs"]["atk"] == 0
+    assert compute({"atk": 10}, [], SKILLS, 5)["buffs"]["atk"] == 5
+    assert compute({"atk": 10}, [], SKILLS, 11)["buffs"]["atk"] == 105
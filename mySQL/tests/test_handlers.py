@@ -0,0 +1,43 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import handlers
+
+
+def test_page_args():
+    assert handlers.page_args(MultiDict()) == (None, None)
+    assert handlers.page_args(MultiDict({"limit": "2", "after": "b"}), str) == (2, "b")
+    for args in ({"limit": "0"}, {"limit": "x"}, {"after": "x"}):
+        with pytest.raises(ValueError):
+            handlers.page_args(MultiDict(args))
+
+
+def test_next_after_only_on_full_page():
+    rows = [{"user_id": "a"}, {"user_id": "b"}]
+    assert handlers.next_after(rows, "user_id", 2) == "b"
+    assert handlers.next_after(rows, "user_id", 3) is None
+    assert handlers.next_after(rows, "user_id", None) is None
+
+
+def test_cart_counts_sums_items():
+    items = [{"item_id": 1}, {"item_id": 1, "count": 2}, {"item_id": 3}]
+    assert handlers.cart_counts(items) == {1: 3, 3: 1}
+    for item in ({"item_id": 1, "count": 0}, {"item_id": 1, "count": True}, 5):
+        with pytest.raises(ValueError):
+            handlers.cart_counts([item])
+
+
+def test_batch_item_denied():
+    assert handlers.batch_item_denied("get_all_user_ids", "/users", True) is None
+    assert handlers.batch_item_denied("run_batch", "/batch", False) is not None
+    assert handlers.batch_item_denied("update_user_position", "/world/update", False) is None
+    assert handlers.batch_item_denied("update_user_position", "/world/update", True) is not None
+
+
+def test_save_decisions():
+    saved = ("tester", 3, (1, 0, 0, 100))
+    assert handlers.needs_select(saved, "other", 3)
+    assert not handlers.needs_select(saved, "tester", 3)
+    assert not handlers.needs_write(saved, 3, (1, 0, 0, 100))
+    assert handlers.needs_write(saved, 3, (2, 0, 0, 100))
+    assert handlers.level_changed(saved, (2, 0, 0, 100))
@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import FakePool
+from position_buffer import PositionBuffer
+
+
+def test_position_readable_while_flushing():
+    seen = []
+    buffer = PositionBuffer(None)
+
+    def respond(query, data_set):
+        # the write is not committed yet
+        seen.append(buffer.get(data_set[2]))
+
+    buffer.pool = FakePool(respond)
+    buffer.put(1, 10, 20)
+    assert buffer.flush() == 1
+    assert seen == [(10, 20)]
+    assert buffer.get(1) is None
+    assert buffer.stats()["inflight"] == 0
+
+
+def test_failed_flush_keeps_position():
+    def respond(query, data_set):
+        raise RuntimeError("gone")
+
+    buffer = PositionBuffer(FakePool(respond))
+    buffer.put(1, 10, 20)
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.get(1) == (10, 20)
+    assert buffer.stats()["pending"] == 1
+    assert buffer.stats()["inflight"] == 0
+
+
+def test_newer_position_wins_over_inflight():
+    buffer = PositionBuffer(None)
+    buffer.put(1, 10, 20)
+    batch = buffer.take()
+    buffer.put(1, 30, 40)
+    assert buffer.get(1) == (30, 40)
+    second = buffer.take()
+    buffer.flushed(batch)
+    # still being written by the second batch
+    assert buffer.get(1) == (30, 40)
+    buffer.flushed(second)
+    assert buffer.get(1) is None
+
+
+def test_flush_only_moves_existing_rows():
+    written = []
+    buffer = PositionBuffer(FakePool(lambda query, data_set: written.append((query, data_set))))
+    buffer.put(7, 10, 20)
+    buffer.flush()
+    query, data_set = written[0]
+    assert query.startswith("UPDATE world") and "INSERT" not in query
+    assert data_set == (10, 20, 7)
@@ -0,0 +1,67 @@
+import pymysql, pytest
+
+from conftest import FakeConnection, FakePool, login
+from purge import CharacterPurger
+
+EXPIRED = [{"char_id": 1, "stat_id": 10}, {"char_id": 2, "stat_id": 11}]
+
+
+def expired_rows(query, data_set):
+    if query.startswith("SELECT char_id, stat_id FROM character_list"):
+        return EXPIRED
+    if query.startswith("SELECT MAX(stat_id)"):
+        return [{"stat_id": None}]
+    return []
+
+
+def test_purge_reported_after_commit():
+    seen = []
+    purger = CharacterPurger(FakePool(expired_rows), batch_size=10)
+    purger.on_purge = lambda char_ids: seen.append((char_ids, purger.pool.acquired[0].commits))
+    purger.run()
+    assert seen == [([1, 2], 1)]
+    assert purger.stats()["purged_characters"] == 2
+
+
+def test_failed_commit_reports_nothing(monkeypatch):
+    def commit(self):
+        raise pymysql.err.OperationalError(2013, "Lost connection")
+
+    monkeypatch.setattr(FakeConnection, "commit", commit)
+    seen = []
+    purger = CharacterPurger(FakePool(expired_rows), batch_size=10)
+    purger.on_purge = seen.append
+    with pytest.raises(pymysql.err.OperationalError):
+        purger.run()
+    assert seen == []
+    assert purger.stats()["purged_characters"] == 0
+
+
+def nickname_taken(query, data_set):
+    if query.startswith("INSERT INTO character_list") and not nickname_taken.purged:
+        raise pymysql.err.IntegrityError(1062, "Duplicate entry")
+    if query.startswith("DELETE FROM character_list"):
+        nickname_taken.purged = True
+    if query.startswith("SELECT char_id, stat_id FROM character_list"):
+        return [{"char_id": 9, "stat_id": 90}]
+    return []
+
+
+def test_rolled_back_batch_keeps_purged_state(client, pool, app_module, monkeypatch):
+    nickname_taken.purged = False
+    pool.respond = nickname_taken
+    monkeypatch.setattr(app_module, "class_stat_template", lambda class_id: {"stat_id": 1, "hp": 100})
+    app_module.save_states.put(9, "tester", 1, (1, 0, 0, 100))
+    login(client)
+    create = {"method": "POST", "path": "/character/create", "body": {"class_id": 1, "nickname": "a"}}
+    response = client.post(
+        "/batch", json={"transaction": True, "requests": [create, {"path": "/nowhere"}]}
+    )
+    assert [r["status"] for r in response.get_json()["data"]] == [201, 404]
+    assert app_module.save_states.get(9) is not None
+    assert app_module.character_purger.stats()["purged_characters"] == 0
+
+    nickname_taken.purged = False
+    response = client.post("/character/create", json={"class_id": 1, "nickname": "a"})
+    assert response.status_code == 201
+    assert app_module.save_states.get(9) is None
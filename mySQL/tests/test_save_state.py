@@ -0,0 +1,47 @@
+from conftest import async_login, login, run
+
+SAVE = {"char_id": 1, "version": 4, "level": 2, "coin": 50, "exp": 10, "hp": 100}
+OLD_STATE = (1, 0, 0, 100)
+
+
+def newer_rows(query, data_set):
+    # written to version 4 by another worker since this one cached version 3
+    if query.startswith("SELECT version"):
+        return [{"version": 4, "level": 1, "coin": 5, "exp": 5, "hp": 100}]
+    if query.startswith("UPDATE character_list"):
+        return [{}]
+    return []
+
+
+def test_stale_cache_is_read_again(client, pool, app_module):
+    pool.respond = newer_rows
+    app_module.save_states.put(1, "tester", 3, OLD_STATE)
+    login(client)
+    response = client.post("/character/save", json=SAVE)
+    app_module.save_states.invalidate(1)
+    assert response.status_code == 200
+    assert response.get_json()["version"] == 5
+
+
+def test_conflict_has_state_in_db(client, pool, app_module):
+    pool.respond = newer_rows
+    app_module.save_states.put(1, "tester", 3, OLD_STATE)
+    login(client)
+    response = client.post("/character/save", json=dict(SAVE, version=2))
+    app_module.save_states.invalidate(1)
+    assert response.status_code == 409
+    assert response.get_json()["data"]["version"] == 4
+
+
+def test_async_stale_cache_is_read_again(async_client, async_pool, async_module):
+    async_pool.respond = newer_rows
+    async_module.save_states.put(1, "tester", 3, OLD_STATE)
+
+    async def play():
+        await async_login(async_client)
+        response = await async_client.post("/character/save", json=SAVE)
+        return response.status_code, await response.get_json()
+
+    status, body = run(play())
+    async_module.save_states.invalidate(1)
+    assert (status, body["version"]) == (200, 5)
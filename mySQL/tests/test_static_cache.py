@@ -0,0 +1,21 @@
+from static_cache import StaticCache
+
+
+def results(skill_class):
+    return {
+        "classes": [{"class_id": 1}, {"class_id": 2}],
+        "class_stats": [],
+        "skills": [{"class_id": skill_class, "level": 1, "name": "slash", "stat_id": 3}],
+        "max_exp": [],
+        "shop": [],
+        "npcs": [],
+        "quests": [],
+    }
+
+
+def test_digest_covers_class_of_rows():
+    first = StaticCache().store(results(1))
+    moved = StaticCache().store(results(2))
+    assert first["skills"] == {1: [{"level": 1, "name": "slash", "stat_id": 3}]}
+    assert first["digest"] != moved["digest"]
+    assert first["digest"] == StaticCache().store(results(1))["digest"]
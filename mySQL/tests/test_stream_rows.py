@@ -0,0 +1,37 @@
+from conftest import login
+
+
+def user_rows(query, data_set):
+    if query.startswith("SELECT user_id FROM user"):
+        return [{"user_id": "a"}, {"user_id": "b"}]
+    return []
+
+
+def test_stream_reads_all_rows(client, pool):
+    pool.respond = user_rows
+    login(client)
+    response = client.get("/users?stream=1")
+    assert response.get_json() == {"data": ["a", "b"]}
+    assert pool.in_use == []
+    assert [discard for _, discard in pool.released] == [False]
+
+
+def test_head_releases_connection(client, pool):
+    pool.respond = user_rows
+    login(client)
+    response = client.head("/users?stream=1")
+    response.close()
+    assert response.status_code == 200
+    assert pool.in_use == []
+
+
+def test_unread_stream_releases_connection(client, pool):
+    pool.respond = user_rows
+    login(client)
+    response = client.get("/users?stream=1", buffered=False)
+    assert len(pool.in_use) == 1
+    # client gone before the first chunk
+    response.close()
+    assert pool.in_use == []
+    # the cursor may still hold unread rows
+    assert [discard for _, discard in pool.released] == [True]
@@ -0,0 +1,45 @@
+import os
+import pytest
+
+from conftest import async_login, login, run
+import simulation
+
+BAD_RADIUS = ("abc", "nan", "inf", "-1", "0", "5001", "")
+
+
+@pytest.fixture
+def world_sim(app_module, async_module, monkeypatch):
+    # off by default (MINIRPG_WORLD_SIM), not started: no ticks
+    if simulation.np is None:
+        pytest.skip("numpy is not installed")
+    sim = simulation.WorldSimulation()
+    monkeypatch.setattr(app_module, "world_sim", sim)
+    monkeypatch.setattr(async_module, "world_sim", sim)
+    return sim
+
+
+def test_bad_radius_is_rejected(client, pool, world_sim):
+    login(client)
+    for radius in BAD_RADIUS:
+        for route in ("/world/nearby/1", "/world/items/1"):
+            response = client.get(f"{route}?radius={radius}")
+            assert response.status_code == 400, (route, radius)
+    assert pool.acquired == []
+
+
+def test_async_bad_radius_is_rejected(async_client, async_pool, world_sim):
+    async def play():
+        await async_login(async_client)
+        codes = []
+        for radius in BAD_RADIUS:
+            for route in ("/world/nearby/1", "/world/items/1"):
+                codes.append((await async_client.get(f"{route}?radius={radius}")).status_code)
+        return codes
+
+    assert set(run(play())) == {400}
+
+
+@pytest.mark.skipif(os.environ.get("MINIRPG_WORLD_SIM") == "1", reason="turned on")
+def test_simulation_off_by_default(app_module, async_module):
+    assert not app_module.WORLD_SIM and app_module.world_sim is None
+    assert not async_module.WORLD_SIM and async_module.world_sim is None
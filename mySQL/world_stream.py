@@ -0,0 +1,142 @@
+import threading, time
+
+
+class Subscriber:
+    def __init__(self, char_id, notify=None):
+        self.char_id = char_id
+        self.pending = {}  # key -> (x, y), merged until the client reads it
+        self.skipped = 0
+        self.closed = False
+        self.last_read = time.monotonic()
+        self.ready = threading.Event()
+        # called from the hub thread when there is something to read
+        self.notify = notify or self.ready.set
+
+    def take(self):
+        pending = self.pending
+        self.pending = {}
+        self.last_read = time.monotonic()
+        self.ready.clear()
+        return pending
+
+
+class WorldHub:
+    # Broadcasts world position changes to streaming clients.
+    # Changes are collected between ticks and sent as one delta per tick.
+    # A client that has not read its last delta gets the next one merged
+    # into it (skipped frame), and one that falls max_lag seconds behind
+    # is dropped and has to reconnect for a new snapshot.
+    def __init__(self, tick_rate=10, max_lag=5.0, max_subscribers=1000):
+        self.tick_rate = tick_rate
+        self.max_lag = max_lag
+        self.max_subscribers = max_subscribers
+        self.tick = 0
+
+        self._changes = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._frames = 0
+        self._skipped = 0
+        self._dropped = 0
+
+    def publish(self, key, x, y):
+        with self._lock:
+            self._changes[key] = (x, y)
+
+    def publish_many(self, changes):
+        # changes: {key: (x, y)}
+        with self._lock:
+            self._changes.update(changes)
+
+    def subscribe(self, char_id, notify=None):
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            sub = Subscriber(char_id, notify)
+            self._subscribers.add(sub)
+            return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            sub.closed = True
+            self._subscribers.discard(sub)
+        sub.notify()
+
+    def read(self, sub, timeout):
+        # delta for the subscriber, {} on timeout, None once it was dropped
+        sub.ready.wait(timeout)
+        return self.take(sub)
+
+    def take(self, sub):
+        # same as read() without waiting, for subscribers with their own notify
+        with self._lock:
+            if sub.closed:
+                return None
+            return sub.take()
+
+    def step(self):
+        now = time.monotonic()
+        with self._lock:
+            self.tick += 1
+            changes = self._changes
+            self._changes = {}
+            for sub in list(self._subscribers):
+                if sub.pending and now - sub.last_read > self.max_lag:
+                    sub.closed = True
+                    self._subscribers.discard(sub)
+                    self._dropped += 1
+                    sub.notify()
+                    continue
+                if not changes:
+                    continue
+                if sub.pending:
+                    sub.skipped += 1
+                    self._skipped += 1
+                sub.pending.update(changes)
+                sub.notify()
+            if changes:
+                self._frames += 1
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="world-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            subs = list(self._subscribers)
+        for sub in subs:
+            self.unsubscribe(sub)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tick": self.tick,
+                "tick_rate": self.tick_rate,
+                "subscribers": len(self._subscribers),
+                "frames": self._frames,
+                "skipped_frames": self._skipped,
+                "dropped_subscribers": self._dropped,
+            }
+
+    def _run(self):
+        interval = 1.0 / self.tick_rate
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            self.step()
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._stopped.wait(delay)
+            else:
+                # fell behind, do not try to catch up with a burst of ticks
+                next_tick = time.monotonic()